@@ -0,0 +1,85 @@
+"""Bytes of AST per node for a large machine-generated script.
+
+    python bench/ast_memory.py [--lox PATH] [--functions N]
+
+Measures everything the parser allocates and the statement list keeps alive
+(nodes, the tokens they hold, literal values), divided by the node count.
+`--lox` imports the parser from another checkout to compare revisions.
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def generate(functions: int) -> str:
+    parts = []
+    for i in range(functions):
+        parts.append(
+            f"fun step{i}(a, b) {{\n"
+            f"  var total = a * {i} + b / 2;\n"
+            f"  if (total > {i * 10}) {{ total = total - {i}; }}\n"
+            f"  while (a < b) {{ a = a + 1; total = total + a; }}\n"
+            f"  print \"step{i}: \" + total;\n"
+            f"  return total;\n"
+            f"}}\n"
+            f"var result{i} = step{i}({i}, {i + 3});\n"
+        )
+    return "".join(parts)
+
+
+def count_nodes(statements) -> int:
+    from lox.expr import Expr
+    from lox.stmt import Stmt
+
+    seen = 0
+    pending = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(node)
+            continue
+        if not isinstance(node, (Expr, Stmt)):
+            continue
+        seen += 1
+        if hasattr(node, "__dict__"):
+            fields = list(vars(node).values())
+        else:
+            fields = [getattr(node, name, None) for cls in type(node).__mro__
+                      for name in getattr(cls, "__slots__", ())]
+        pending.extend(fields)
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lox", default=os.path.dirname(HERE), help="checkout to import lox from")
+    parser.add_argument("--functions", type=int, default=2000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.lox))
+    from lox.scanner import Scanner
+    from lox.parser import Parser
+
+    source = generate(args.functions)
+
+    gc.collect()
+    tracemalloc.start()
+    tokens = Scanner(source).scan_tokens()
+    statements = Parser(tokens).parse()
+    # drop the token list; only what the AST references survives
+    del tokens
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = count_nodes(statements)
+    print(f"source {len(source) / 1024:.0f} KiB, {nodes} nodes, "
+          f"AST {current / 1024:.0f} KiB, {current / nodes:.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
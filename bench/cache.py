@@ -0,0 +1,54 @@
+"""Front-end time vs a .loxc cache hit on a large generated script.
+
+    python bench/cache.py [--functions N] [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from lox.__main__ import Lox
+from lox.cache import ProgramCache
+from lox.interpreter import Interpreter
+from ast_memory import generate
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        Lox.interpreter = Interpreter()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    source = generate(args.functions)
+    with tempfile.TemporaryDirectory() as directory:
+        Lox.interpreter = Interpreter()
+        resolutions = []
+        ProgramCache(directory).store(source, Lox.interpreter, Lox.front_end(source, resolutions), resolutions)
+
+        cold = median_ms(lambda: Lox.front_end(source), args.repeat)
+        # a fresh cache each time, so the entry comes from disk
+        warm = median_ms(lambda: ProgramCache(directory).fetch(source, Lox.interpreter), args.repeat)
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+    print(f"source {len(source) / 1024:.0f} KiB, .loxc {size / 1024:.0f} KiB")
+    print(f"front end {cold:8.1f} ms")
+    print(f"cache hit {warm:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-call cost of a Lox function that returns, on the tree walker.
+
+    python bench/calls.py [--lox PATH] [--calls N] [--repeat N]
+
+Times a loop that calls `fun id(x) { return x; }` against the same loop
+without the call, and reports the difference per call. `--lox` imports the
+interpreter from another checkout, so two revisions can be compared.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+LOOP = """
+fun id(x) {{ return x; }}
+var i = 0;
+var total = 0;
+while (i < {calls}) {{
+  total = total + {body};
+  i = i + 1;
+}}
+print total;
+"""
+
+
+def run(source: str) -> float:
+    from lox.__main__ import Lox
+    from lox.interpreter import Interpreter
+
+    Lox.interpreter = Interpreter()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        Lox.run(source)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lox", default=os.path.dirname(HERE), help="checkout to import lox from")
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.lox))
+    with_call = LOOP.format(calls=args.calls, body="id(i)")
+    without = LOOP.format(calls=args.calls, body="i")
+
+    cost = []
+    for _ in range(args.repeat):
+        cost.append((run(with_call) - run(without)) / args.calls)
+    print(f"{statistics.median(cost) * 1e9:.0f} ns per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Time and peak memory of the tree walker on a closure-heavy script.
+
+    python bench/environments.py [--lox PATH] [--repeat N] [script.lox]
+
+`--lox` imports the interpreter from another checkout, so two revisions can
+be compared side by side.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(source):
+    from lox.__main__ import Lox
+    from lox.interpreter import Interpreter
+
+    Lox.interpreter = Interpreter()
+    with redirect_stdout(io.StringIO()):
+        Lox.run(source)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("script", nargs="?", default=os.path.join(HERE, "closures.lox"))
+    parser.add_argument("--lox", default=os.path.dirname(HERE), help="checkout to import lox from")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.lox))
+    with open(args.script) as file:
+        source = file.read()
+
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        run(source)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{os.path.basename(args.script)}: median {statistics.median(times) * 1000:.1f} ms, "
+          f"peak {peak / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Times the programs in bench/suite under `python -m lox` and reports JSON.
+
+    python bench/run.py [--engine E] [--rev REV] [--repeat N] [--json PATH]
+                        [--baseline-engine E] [--baseline-rev REV] [--threshold PCT]
+                        [--lox-args ARGS] [program.lox ...]
+
+Each program runs `--repeat` times in a fresh process; the report has the
+median and standard deviation of the wall times, in seconds. `--rev` runs a
+git revision from a temporary worktree instead of this checkout.
+
+Giving `--baseline-engine` and/or `--baseline-rev` times a baseline too,
+interleaving its runs with the candidate's so drift affects both alike, and
+exits with status 1 if any program's median is more than `--threshold`
+percent slower than the baseline's, or prints something different.
+
+    python bench/run.py --engine vm --baseline-engine tree
+    python bench/run.py --baseline-rev HEAD~1 --threshold 5
+"""
+import argparse
+import glob
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+
+@contextmanager
+def checkout(rev):
+    """A directory holding `rev`, or this checkout when rev is None."""
+    if rev is None:
+        yield ROOT
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "lox")
+        subprocess.run(["git", "-C", ROOT, "worktree", "add", "--detach", "-q", path, rev], check=True)
+        try:
+            yield path
+        finally:
+            subprocess.run(["git", "-C", ROOT, "worktree", "remove", "--force", path], check=True)
+
+
+class Target:
+    def __init__(self, label: str, root: str, engine: str, lox_args: list[str]):
+        self.label = label
+        self.root = root
+        self.engine = engine
+        self.lox_args = lox_args
+
+    def run(self, program: str) -> tuple[float, str]:
+        command = [sys.executable, "-m", "lox", "--engine", self.engine, *self.lox_args, program]
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=self.root, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise SystemExit(f"{self.label}: {os.path.basename(program)} exited {result.returncode}\n"
+                             f"{result.stderr}")
+        return elapsed, result.stdout
+
+
+def summary(times: list[float]) -> dict:
+    return {
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "runs": times,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("programs", nargs="*", help="default: bench/suite/*.lox")
+    parser.add_argument("--engine", default="tree")
+    parser.add_argument("--rev", help="git revision to time (default: this checkout)")
+    parser.add_argument("--baseline-engine", help="compare against this engine")
+    parser.add_argument("--baseline-rev", help="compare against this git revision")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent slowdown against the baseline that fails the run (default: 10)")
+    parser.add_argument("--lox-args", default="--no-cache",
+                        help="extra arguments for python -m lox (default: --no-cache)")
+    parser.add_argument("--json", metavar="PATH", help="write the report here instead of stdout")
+    args = parser.parse_args()
+
+    programs = [os.path.abspath(p) for p in args.programs] or sorted(glob.glob(os.path.join(HERE, "suite", "*.lox")))
+    compare = args.baseline_engine is not None or args.baseline_rev is not None
+    lox_args = shlex.split(args.lox_args)
+
+    with ExitStack() as stack:
+        targets = [Target("candidate", stack.enter_context(checkout(args.rev)), args.engine, lox_args)]
+        if compare:
+            root = stack.enter_context(checkout(args.baseline_rev)) if args.baseline_rev else targets[0].root
+            targets.append(Target("baseline", root, args.baseline_engine or args.engine, lox_args))
+
+        report = {
+            target.label: {"rev": args.rev if target.label == "candidate" else args.baseline_rev,
+                           "engine": target.engine, "results": {}}
+            for target in targets
+        }
+        failures = []
+        for program in programs:
+            name = os.path.splitext(os.path.basename(program))[0]
+            times = {target.label: [] for target in targets}
+            outputs = {}
+            for _ in range(args.repeat):
+                for target in targets:
+                    elapsed, outputs[target.label] = target.run(program)
+                    times[target.label].append(elapsed)
+            for target in targets:
+                report[target.label]["results"][name] = summary(times[target.label])
+            print(f"{name}: " + ", ".join(f"{label} {statistics.median(t):.3f}s" for label, t in times.items()),
+                  file=sys.stderr)
+
+            if not compare:
+                continue
+            if outputs["candidate"] != outputs["baseline"]:
+                failures.append(f"{name}: output differs from the baseline")
+            ratio = statistics.median(times["candidate"]) / statistics.median(times["baseline"])
+            report.setdefault("ratios", {})[name] = ratio
+            if ratio > 1 + args.threshold / 100:
+                failures.append(f"{name}: {100 * (ratio - 1):.1f}% slower than the baseline")
+
+    report["failures"] = failures
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    for failure in failures:
+        print("REGRESSION " + failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
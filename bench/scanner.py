@@ -0,0 +1,49 @@
+"""Scanner throughput in MB/s: char-by-char `scan_tokens` vs regex `iter_tokens`.
+
+    python bench/scanner.py [--functions N] [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from lox.scanner import Scanner
+from ast_memory import generate
+
+
+def throughput(source: str, scan, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scan(Scanner(source))
+        times.append(time.perf_counter() - start)
+    return len(source.encode("utf-8")) / statistics.median(times) / 1e6
+
+
+def drain(scanner: Scanner):
+    for _ in scanner.iter_tokens():
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--functions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    source = generate(args.functions)
+    print(f"source: {len(source) / 1e6:.1f} MB")
+    for name, scan in [
+        ("scan_tokens", lambda s: s.scan_tokens()),
+        ("list(iter_tokens)", lambda s: list(s.iter_tokens())),
+        ("iter_tokens (streamed)", drain),
+    ]:
+        print(f"{name:>24}: {throughput(source, scan, args.repeat):6.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Peak memory and time to first output: `Lox.run` vs `Lox.run_stream`.
+
+    python bench/streaming.py [--blocks N] [--engine NAME]
+
+The script is a long run of top-level blocks, so nothing a finished block
+allocated is reachable from later ones.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from lox.__main__ import Lox
+from lox.engines import ENGINES
+
+
+def generate(blocks: int) -> str:
+    parts = []
+    for i in range(blocks):
+        parts.append(
+            f"{{\n"
+            f"  var a = {i};\n"
+            f"  var total = a * 2 + {i} / 4;\n"
+            f"  if (total > {i * 3}) {{ total = total - a; }}\n"
+            f"  print \"block{i}: \" + total;\n"
+            f"}}\n"
+        )
+    return "".join(parts)
+
+
+class FirstWrite(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.first = None
+
+    def write(self, text):
+        if self.first is None:
+            self.first = time.perf_counter()
+        return super().write(text)
+
+
+def measure(run, source: str, engine: str):
+    Lox.interpreter = ENGINES[engine]()
+    out = FirstWrite()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with redirect_stdout(out):
+        run(source)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out.first - start, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--blocks", type=int, default=5000)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="tree")
+    args = parser.parse_args()
+
+    source = generate(args.blocks)
+    print(f"source: {len(source) / 1e6:.1f} MB, engine {args.engine}")
+    for name, run in [("run", Lox.run), ("run_stream", Lox.run_stream)]:
+        first, total, peak = measure(run, source, args.engine)
+        print(f"{name:>10}: first output {first * 1000:8.1f} ms, "
+              f"total {total:6.2f} s, peak {peak / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+# from 
+
+# def _runner():
+
+import importlib
+
+# The embedding API, imported on first use: the command line and batch
+# workers never need it, nor asyncio.
+_EXPORTS = {
+    "Session": ".session",
+    "SessionPool": ".session",
+    "AsyncSession": ".aio",
+    "AsyncNative": ".aio",
+    "MeteredSession": ".meter",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,35 @@
+import os
 import sys
+import argparse
 
 from lox.scanner import Scanner
 from lox.parser import Parser
-from lox.expr import AstPrinter
 from lox.interpreter import Interpreter
 from lox.resolver import Resolver
+from lox.engines import ENGINES
+from lox.cache import ProgramCache, ResolutionLog
+from lox.optimizer import Optimizer
+from lox.profiler import ProfilingInterpreter
+from lox.sampler import SamplingInterpreter
+from lox.jit import LoopJit
 
 class Lox:
 
     interpreter = Interpreter()
     had_error = False
     had_runtime_error = False
+    stream = False
+    use_cache = True
+    cache_stats = False
+    optimize = 0
+    memoize = False
+    memo_stats = False
+    jit_stats = False
+    quicken_stats = False
+    memory_stats = False
+    profiler = None
+    profile_stacks = None
+    program_cache = ProgramCache()
 
     @staticmethod
     def error(line, message):
@@ -22,20 +41,145 @@ class Lox:
         Lox.had_error = True
 
     @staticmethod
-    def main():
-        Lox.run_file("hello.lox")
-        if len(sys.argv) > 2:
-            print("Usage: lox [script]")
-            sys.exit(64)
-        elif len(sys.argv) == 2:
-            Lox.run_file(sys.argv[1])
+    def runtime_error(error):
+        print(error, file=sys.stderr)
+        Lox.had_runtime_error = True
+
+    @staticmethod
+    def main(argv=None):
+        argv = sys.argv[1:] if argv is None else argv
+        if argv[:1] == ["batch"]:
+            from lox.batch import main as batch_main
+            batch_main(argv[1:])
+            return
+        parser = argparse.ArgumentParser(prog="lox")
+        parser.add_argument("script", nargs="?")
+        parser.add_argument("--engine", choices=sorted(ENGINES), default="tree",
+                            help="execution engine (default: tree)")
+        parser.add_argument("--stream", action="store_true",
+                            help="run each top-level declaration as soon as it is parsed")
+        parser.add_argument("-O", dest="optimize", type=int, choices=sorted(Optimizer.PIPELINES), default=0,
+                            help="optimization level: -O1 folds constants and drops dead code, "
+                                 "-O2 also propagates constant locals (default: -O0)")
+        parser.add_argument("--max-depth", type=int,
+                            help="maximum Lox call depth for the vm engine (default: 100000); "
+                                 "only the vm supports deep recursion, the other engines report "
+                                 "\"Stack overflow.\" after a few hundred nested calls")
+        parser.add_argument("--memoize", action="store_true",
+                            help="cache results of pure functions (tree engine, scripts only)")
+        parser.add_argument("--memo-size", type=int, default=1024,
+                            help="entries kept per memoized function (default: 1024)")
+        parser.add_argument("--memo-stats", action="store_true",
+                            help="print memo hits and misses to stderr")
+        parser.add_argument("--jit", action="store_true",
+                            help="compile hot while loops to Python (tree engine)")
+        parser.add_argument("--jit-stats", action="store_true",
+                            help="print how many loops were compiled and deoptimized to stderr")
+        parser.add_argument("--quicken-stats", action="store_true",
+                            help="print how many Binary nodes were specialized and deoptimized to stderr")
+        parser.add_argument("--profile", action="store_true",
+                            help="print per-function and per-line hot spots to stderr (tree engine)")
+        parser.add_argument("--profile-stacks", metavar="PATH",
+                            help="where --profile or --sample writes collapsed stacks (default: SCRIPT.folded)")
+        parser.add_argument("--sample", action="store_true",
+                            help="sample the Lox call stack and print a histogram to stderr (tree engine)")
+        parser.add_argument("--sample-rate", type=int, default=1000, metavar="HZ",
+                            help="samples per second of CPU time for --sample (default: 1000)")
+        parser.add_argument("--max-steps", type=int, metavar="N",
+                            help="stop after N loop iterations and calls (tree engine)")
+        parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                            help="stop after SECONDS of wall-clock time (tree engine)")
+        parser.add_argument("--max-memory", type=int, metavar="BYTES",
+                            help="stop once strings, frames and closures held pass BYTES (tree engine)")
+        parser.add_argument("--memory-stats", action="store_true",
+                            help="print the peak memory held to stderr (tree engine)")
+        parser.add_argument("--no-cache", dest="cache", action="store_false",
+                            help="don't read or write __loxcache__")
+        parser.add_argument("--cache-stats", action="store_true",
+                            help="print cache hits and misses to stderr")
+        args = parser.parse_args(argv)
+
+        Lox.interpreter = ENGINES[args.engine]()
+        if args.max_memory is not None or args.memory_stats:
+            # compiled loops keep their variables outside metered frames
+            if args.engine != "tree" or args.jit or args.profile or args.sample:
+                parser.error("--max-memory and --memory-stats need --engine tree, "
+                             "without --jit, --profile or --sample")
+            from lox.meter import MeteredInterpreter
+            Lox.interpreter = MeteredInterpreter(args.max_memory)
+        if args.profile or args.sample:
+            if args.engine != "tree" or not args.script or (args.profile and args.sample):
+                parser.error("--profile or --sample needs --engine tree and a script")
+            if args.profile:
+                Lox.interpreter = ProfilingInterpreter()
+                Lox.profiler = Lox.interpreter.profile
+            else:
+                Lox.interpreter = SamplingInterpreter(args.sample_rate)
+                Lox.profiler = Lox.interpreter.sampler
+            Lox.profile_stacks = args.profile_stacks or os.path.splitext(args.script)[0] + ".folded"
+        if args.jit:
+            # compiled loops bypass the hooks --profile and --sample rely on
+            if args.engine != "tree" or args.profile or args.sample:
+                parser.error("--jit needs --engine tree and can't be used with --profile or --sample")
+            Lox.interpreter.jit = LoopJit(Lox.interpreter)
+        if args.max_steps is not None or args.timeout is not None:
+            if not hasattr(Lox.interpreter, "limit"):
+                parser.error("--max-steps and --timeout need --engine tree")
+            Lox.interpreter.limit(args.max_steps, args.timeout)
+        if args.max_depth is not None:
+            # the other engines recurse in Python and overflow after a few
+            # hundred Lox calls; only the vm runs deep recursion
+            if not hasattr(Lox.interpreter, "max_depth"):
+                parser.error("--max-depth needs --engine vm")
+            Lox.interpreter.max_depth = args.max_depth
+        if args.memoize:
+            # purity is judged over the whole script at once
+            if not hasattr(Lox.interpreter, "memoize"):
+                parser.error("--memoize needs --engine tree")
+            if not args.script or args.stream:
+                parser.error("--memoize needs a script and can't be used with --stream")
+            Lox.interpreter.memo_size = args.memo_size
+        Lox.stream = args.stream
+        Lox.use_cache = args.cache
+        Lox.cache_stats = args.cache_stats
+        Lox.optimize = args.optimize
+        Lox.memoize = args.memoize
+        Lox.memo_stats = args.memo_stats
+        Lox.jit_stats = args.jit_stats
+        Lox.quicken_stats = args.quicken_stats
+        Lox.memory_stats = args.memory_stats
+        if args.script:
+            Lox.run_file(args.script)
         else:
             Lox.run_prompt()
 
     @staticmethod
     def run_file(filename):
+        cache = Lox.cache()
+        if cache is not None:
+            cache.directory = os.path.join(os.path.dirname(os.path.abspath(filename)), "__loxcache__")
+            cache.script = os.path.splitext(os.path.basename(filename))[0]
         with open(filename, "r") as file:
-            Lox.run(file.read())
+            source = file.read()
+        if Lox.stream:
+            Lox.run_stream(source)
+        else:
+            Lox.run(source)
+        if Lox.cache_stats and cache is not None:
+            print(cache.stats(), file=sys.stderr)
+        if Lox.profiler is not None:
+            print(Lox.profiler.report(), file=sys.stderr)
+            Lox.profiler.write_collapsed(Lox.profile_stacks)
+        if Lox.jit_stats and getattr(Lox.interpreter, "jit", None) is not None:
+            print("jit " + Lox.interpreter.jit.stats(), file=sys.stderr)
+        if Lox.quicken_stats and hasattr(Lox.interpreter, "quicken_stats"):
+            for line in Lox.interpreter.quicken_stats():
+                print("quicken " + line, file=sys.stderr)
+        if Lox.memory_stats:
+            print("memory " + Lox.interpreter.meter.summary(), file=sys.stderr)
+        if Lox.memo_stats and Lox.memoize:
+            for line in Lox.interpreter.memo_stats():
+                print("memo " + line, file=sys.stderr)
         if Lox.had_error:
             sys.exit(65)
         if Lox.had_runtime_error:
@@ -54,29 +198,93 @@ class Lox:
                 print("\nExiting...")
                 break
 
+    @staticmethod
+    def cache():
+        # engines with their own code cache store compiled code instead of
+        # resolved programs
+        if not Lox.use_cache:
+            return None
+        cache = getattr(Lox.interpreter, "code_cache", None) or Lox.program_cache
+        # optimized programs differ, so they get their own entries
+        cache.options = f"O{Lox.optimize}"
+        return cache
+
     @staticmethod
     def run(source):
+        # a cache hit skips the whole front end
+        cache = Lox.cache()
+        program = cache.fetch(source, Lox.interpreter) if cache is not None else None
+        if program is None:
+            resolutions = []
+            program = Lox.front_end(source, resolutions)
+            if program is None:
+                return
+            if cache is not None:
+                program = cache.store(source, Lox.interpreter, program, resolutions)
+
+        if Lox.memoize:
+            Lox.interpreter.memoize(program)
+
+        try:
+            r = Lox.interpreter.interpret(program)
+        except Interpreter.RuntimeError as e:
+            Lox.runtime_error(e)
+            return
+        if r:
+            print(r)
+
+    @staticmethod
+    def run_stream(source):
+        # scan, parse, resolve and run one top-level declaration at a time, so
+        # only the declaration in flight is held as tokens and AST
+        parser = Parser(Scanner(source).iter_tokens())
+        resolutions = []
+        resolver = Resolver(ResolutionLog(Lox.interpreter, resolutions))
+        optimizer = Optimizer(Lox.interpreter, Lox.optimize)
+        r = None
+        for statement in parser.iter_parse():
+            if statement is None:
+                Lox.had_error = True
+            if Lox.had_error:
+                return
+            resolver.resolve([statement])
+            if Lox.had_error:
+                return
+            program = optimizer.optimize([statement], resolutions)
+            resolutions.clear()
+            try:
+                r = Lox.interpreter.interpret(program)
+            except Interpreter.RuntimeError as e:
+                Lox.runtime_error(e)
+                return
+            # resolutions are only read while resolving and compiling; drop
+            # them so finished declarations can be freed
+            Lox.interpreter._locals.clear()
+        if r:
+            print(r)
+
+    @staticmethod
+    def front_end(source, resolutions: list = None):
         scanner = Scanner(source)
-        tokens = scanner.scan_tokens()
-        # for t in tokens:
-        #     print(t)
+        tokens = list(scanner.iter_tokens())
 
         parser = Parser(tokens)
         statements = parser.parse()
+        # the parser reports its errors itself and leaves None in their place
+        if None in statements:
+            Lox.had_error = True
         if Lox.had_error:
-            return
-        
-        # print(AstPrinter()._print(statements))
-        
-        resolver = Resolver(Lox.interpreter)
+            return None
+
+        if resolutions is None:
+            resolutions = []
+        resolver = Resolver(ResolutionLog(Lox.interpreter, resolutions))
         resolver.resolve(statements)
         
         if Lox.had_error:
-            return
-        
-        r = Lox.interpreter.interpret(statements)
-        if r:
-            print(r)
+            return None
+
+        return Optimizer(Lox.interpreter, Lox.optimize).optimize(statements, resolutions)
         
 
 if __name__ == "__main__":
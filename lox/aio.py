@@ -0,0 +1,272 @@
+"""Cooperative execution: many Lox scripts as asyncio tasks on one thread.
+
+    async def fetch(url):
+        ...
+
+    prototype = AsyncSession()
+    prototype.define("fetch", AsyncNative(fetch, 1))
+
+    async def handle(script):
+        return await prototype.fork().run_async(script)
+
+AsyncInterpreter runs statements as coroutines, hands control back to the
+event loop every `slice` statements, and awaits any native whose call()
+returns an awaitable. Expressions without a call can neither loop nor wait,
+so they still go through the blocking tree walker, quickening and all.
+"""
+import asyncio
+import inspect
+from typing import Any
+
+from .expr import Expr, Binary, GenericBinary, Unary, Grouping, Assign, Logical, Call
+from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
+from .token_type import TokenType
+from .environment import Environment
+from .interpreter import Interpreter, QUICKENED
+from .lox_callable import LoxCallable
+from .lox_function import LoxFunction, TailCall, TAIL_CALLABLE
+from .rope import flatten
+from .session import Session
+
+
+class AsyncNative(LoxCallable):
+    """Exposes `async def fn(*arguments)` to Lox. Only an AsyncInterpreter
+    waits for the result; the other engines would get the coroutine."""
+
+    def __init__(self, fn, arity: int):
+        self.fn = fn
+        self._arity = arity
+
+    def arity(self) -> int:
+        return self._arity
+
+    def call(self, interpreter, arguments: list):
+        return self.fn(*arguments)
+
+
+def has_call(expr: Expr) -> bool:
+    if isinstance(expr, Call):
+        return True
+    if isinstance(expr, (Binary, Logical)):
+        return has_call(expr.left) or has_call(expr.right)
+    if isinstance(expr, Unary):
+        return has_call(expr.right)
+    if isinstance(expr, Grouping):
+        return has_call(expr.expression)
+    if isinstance(expr, Assign):
+        return has_call(expr.value)
+    return False
+
+
+def is_blocking(node) -> bool:
+    """Whether `node` can run on the plain tree walker without starving the
+    loop: it runs no statements of its own and calls nothing."""
+    if isinstance(node, Expr):
+        return not has_call(node)
+    if isinstance(node, (Expression, Print)):
+        return not has_call(node.expression)
+    if isinstance(node, Var):
+        return node.initializer is None or not has_call(node.initializer)
+    if isinstance(node, Return):
+        return node.value is None or not has_call(node.value)
+    return isinstance(node, Function)
+
+
+class AsyncInterpreter(Interpreter):
+    def __init__(self, slice: int = 1000):
+        super().__init__()
+        # statements run between returns to the event loop
+        self.slice = slice
+        self.countdown = slice
+        self.switches = 0
+        # node -> is_blocking(node), worked out once per node
+        self.blocking: dict = {}
+
+    async def interpret_async(self, statements: list[Stmt]):
+        try:
+            r = 0
+            for statement in statements:
+                if isinstance(statement, Expression):
+                    r = await self.evaluate_async(statement.expression)
+                else:
+                    r = await self.execute_async(statement)
+            return flatten(r)
+        except RecursionError:
+            raise self.RuntimeError("Stack overflow.")
+        except self.BudgetExceeded:
+            raise
+        except Exception as e:
+            raise self.RuntimeError(e)
+        finally:
+            self.output.flush()
+
+    async def execute_async(self, stmt: Stmt):
+        self.countdown -= 1
+        if not self.countdown:
+            self.countdown = self.slice
+            self.switches += 1
+            await asyncio.sleep(0)
+        blocking = self.blocking.get(stmt)
+        if blocking is None:
+            blocking = self.blocking[stmt] = is_blocking(stmt)
+        if blocking:
+            return stmt.accept(self)
+        return await self.STATEMENTS[type(stmt)](self, stmt)
+
+    async def evaluate_async(self, expr: Expr):
+        blocking = self.blocking.get(expr)
+        if blocking is None:
+            blocking = self.blocking[expr] = is_blocking(expr)
+        if blocking:
+            return expr.accept(self)
+        return await self.EXPRESSIONS[type(expr)](self, expr)
+
+    async def execute_block_async(self, statements: list[Stmt], environment: Environment):
+        previous = self.environment
+        self.environment = environment
+        try:
+            for statement in statements:
+                completion = await self.execute_async(statement)
+                if completion is not None:
+                    return completion
+        finally:
+            self.environment = previous
+
+    async def call_async(self, callee: Any, arguments: list):
+        if not isinstance(callee, LoxFunction):
+            value = self.call(callee, arguments)
+            if inspect.isawaitable(value):
+                value = await value
+            return value
+        if len(arguments) != callee.arity():
+            raise self.RuntimeError(f"Expected {callee.arity()} arguments but got {len(arguments)}.")
+        # LoxFunction.call, with the body run as a coroutine
+        function = callee
+        while True:
+            self.fuel -= 1
+            if self.fuel < 0:
+                self.refuel()
+            environment = self.Environment(function.closure, list(arguments))
+            completion = await self.execute_block_async(function.declaration.body, environment)
+            if completion is None:
+                return None
+            if type(completion) is not TailCall:
+                return completion[0]
+            function = completion.function
+            arguments = completion.arguments
+
+    # ============================ statements ============================
+
+    async def block_async(self, stmt: Block):
+        return await self.execute_block_async(stmt.statements, self.Environment(self.environment))
+
+    async def expression_async(self, stmt: Expression):
+        await self.evaluate_async(stmt.expression)
+        return None
+
+    async def if_async(self, stmt: If):
+        if self.is_truthy(await self.evaluate_async(stmt.condition)):
+            return await self.execute_async(stmt.then_branch)
+        elif stmt.else_branch is not None:
+            return await self.execute_async(stmt.else_branch)
+        return None
+
+    async def print_async(self, stmt: Print):
+        value = await self.evaluate_async(stmt.expression)
+        self.output.write(self.stringify(value))
+        return None
+
+    async def return_async(self, stmt: Return):
+        call = stmt.value
+        if type(call) is Call and call.tail:
+            callee = await self.evaluate_async(call.callee)
+            arguments = [await self.evaluate_async(arg) for arg in call.arguments]
+            if type(callee) in TAIL_CALLABLE and len(arguments) == len(callee.declaration.params):
+                return TailCall(callee, arguments)
+            return (await self.call_async(callee, arguments),)
+        return (await self.evaluate_async(stmt.value),)
+
+    async def var_async(self, stmt: Var):
+        value = await self.evaluate_async(stmt.initializer)
+        self.environment.define(stmt.name.lexeme, value)
+        return None
+
+    async def while_async(self, stmt: While):
+        while self.is_truthy(await self.evaluate_async(stmt.condition)):
+            self.fuel -= 1
+            if self.fuel < 0:
+                self.refuel()
+            completion = await self.execute_async(stmt.body)
+            if completion is not None:
+                return completion
+        return None
+
+    STATEMENTS = {
+        Block: block_async,
+        Expression: expression_async,
+        If: if_async,
+        Print: print_async,
+        Return: return_async,
+        Var: var_async,
+        While: while_async,
+    }
+
+    # ============================ expressions ============================
+
+    async def assign_async(self, expr: Assign):
+        value = await self.evaluate_async(expr.value)
+        if expr.depth is not None:
+            self.environment.assign_at(expr.depth, expr.slot, value)
+        else:
+            self._globals.assign(expr.name, value)
+        return value
+
+    async def binary_async(self, expr: Binary):
+        left = await self.evaluate_async(expr.left)
+        right = await self.evaluate_async(expr.right)
+        return self.binary(expr, left, right)
+
+    async def call_expr_async(self, expr: Call):
+        callee = await self.evaluate_async(expr.callee)
+        arguments = [await self.evaluate_async(arg) for arg in expr.arguments]
+        return await self.call_async(callee, arguments)
+
+    async def grouping_async(self, expr: Grouping):
+        return await self.evaluate_async(expr.expression)
+
+    async def logical_async(self, expr: Logical):
+        left = await self.evaluate_async(expr.left)
+        if expr.op.type == TokenType.OR:
+            if self.is_truthy(left):
+                return left
+        elif not self.is_truthy(left):
+            return left
+        return await self.evaluate_async(expr.right)
+
+    async def unary_async(self, expr: Unary):
+        right = await self.evaluate_async(expr.right)
+        if expr.op.type == TokenType.MINUS:
+            return -float(right)
+        return not self.is_truthy(right)
+
+    EXPRESSIONS = {
+        Assign: assign_async,
+        Call: call_expr_async,
+        Grouping: grouping_async,
+        Logical: logical_async,
+        Unary: unary_async,
+        # a node with a call in it is never quickened, but may already be
+        # if a blocking run got to it first
+        **dict.fromkeys((Binary, GenericBinary, *QUICKENED.values()), binary_async),
+    }
+
+
+class AsyncSession(Session):
+    """A Session whose scripts can also run as asyncio tasks."""
+
+    engine = AsyncInterpreter
+
+    async def run_async(self, source: str, steps: int = None, seconds: float = None) -> Any:
+        program = self.compile(source)
+        self.interpreter.limit(steps, seconds)
+        return await self.interpreter.interpret_async(program)
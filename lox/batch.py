@@ -0,0 +1,136 @@
+"""`python -m lox batch`: run many scripts, each isolated, across a process pool.
+
+Workers stay up for the whole batch, so imports and the in-memory program
+cache are paid for once per worker rather than once per script, and all of
+them share each script directory's __loxcache__ on disk. Every script gets a
+fresh engine and its own captured stdout, stderr and exit code.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+from contextlib import redirect_stdout, redirect_stderr
+
+from .__main__ import Lox
+from .engines import ENGINES
+from .optimizer import Optimizer
+
+
+class Result:
+    __slots__ = ("path", "status", "stdout", "stderr")
+
+    def __init__(self, path: str, status: int, stdout: str, stderr: str):
+        self.path = path
+        self.status = status
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def find_scripts(paths: list[str]) -> list[str]:
+    scripts = []
+    for path in paths:
+        if not os.path.isdir(path):
+            scripts.append(path)
+            continue
+        for directory, subdirectories, files in os.walk(path):
+            subdirectories[:] = sorted(d for d in subdirectories if d != "__loxcache__")
+            scripts.extend(os.path.join(directory, f) for f in sorted(files) if f.endswith(".lox"))
+    return scripts
+
+
+def output_names(scripts: list[str]) -> list[str]:
+    """Each script's path below the directory holding them all, less `.lox`.
+
+    Unlike base names these are distinct for distinct scripts, so
+    `a/x.lox` and `b/x.lox` get separate output files.
+    """
+    paths = [os.path.abspath(script) for script in scripts]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths]) if paths else ""
+    return [os.path.splitext(os.path.relpath(path, root))[0] for path in paths]
+
+
+# per-worker state, set up once by start_worker
+_engine = None
+_code_cache = None
+
+
+def start_worker(engine: str, use_cache: bool, optimize: int):
+    global _engine, _code_cache
+    _engine = engine
+    Lox.use_cache = use_cache
+    Lox.optimize = optimize
+    # engines with a code cache of their own would otherwise start cold
+    _code_cache = getattr(ENGINES[engine](), "code_cache", None)
+
+
+def run_script(path: str) -> Result:
+    Lox.interpreter = ENGINES[_engine]()
+    if _code_cache is not None:
+        Lox.interpreter.code_cache = _code_cache
+    Lox.had_error = Lox.had_runtime_error = False
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = 0
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            Lox.run_file(path)
+        except SystemExit as e:
+            status = e.code or 0
+        except Exception as e:
+            # e.g. an unreadable file; one script shouldn't end the batch
+            print(f"{type(e).__name__}: {e}", file=sys.stderr)
+            status = 1
+    return Result(path, status, stdout.getvalue(), stderr.getvalue())
+
+
+def run_batch(scripts: list[str], jobs: int, engine: str = "tree",
+              use_cache: bool = True, optimize: int = 0) -> list[Result]:
+    """Runs `scripts` on `jobs` worker processes; results are in script order."""
+    options = (engine, use_cache, optimize)
+    if jobs == 1:
+        start_worker(*options)
+        return [run_script(path) for path in scripts]
+    chunksize = max(1, len(scripts) // (jobs * 8))
+    with multiprocessing.Pool(jobs, initializer=start_worker, initargs=options) as pool:
+        return pool.map(run_script, scripts, chunksize)
+
+
+def main(argv: list[str]):
+    parser = argparse.ArgumentParser(prog="lox batch")
+    parser.add_argument("paths", nargs="+", help="scripts, or directories searched for *.lox")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="tree")
+    parser.add_argument("-O", dest="optimize", type=int, choices=sorted(Optimizer.PIPELINES), default=0)
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="don't read or write __loxcache__")
+    parser.add_argument("--output", metavar="DIR",
+                        help="write each script's stdout and stderr to DIR/<path>.out and .err, "
+                             "<path> being relative to the directory holding all the scripts, "
+                             "instead of printing them")
+    args = parser.parse_args(argv)
+
+    scripts = find_scripts(args.paths)
+    start = time.perf_counter()
+    results = run_batch(scripts, max(1, args.jobs), args.engine, args.cache, args.optimize)
+    elapsed = time.perf_counter() - start
+
+    names = output_names(scripts)
+    for name, result in zip(names, results):
+        print(f"== {result.path} (exit {result.status})")
+        if args.output:
+            base = os.path.join(args.output, name)
+            os.makedirs(os.path.dirname(base), exist_ok=True)
+            for suffix, text in ((".out", result.stdout), (".err", result.stderr)):
+                with open(base + suffix, "w") as file:
+                    file.write(text)
+        else:
+            sys.stdout.write(result.stdout)
+            sys.stderr.write(result.stderr)
+
+    failed = sum(1 for result in results if result.status != 0)
+    rate = len(results) / elapsed if elapsed else 0.0
+    print(f"{len(results)} scripts in {elapsed:.2f}s ({rate:.1f} scripts/s) on {args.jobs} "
+          f"job{'s' if args.jobs != 1 else ''}, {failed} failed", file=sys.stderr)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,166 @@
+import gc
+import hashlib
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from .stmt import Stmt
+
+# Bump whenever the AST or the resolver's output changes shape, so stale
+# .loxc files miss instead of loading into the wrong classes.
+CACHE_VERSION = 2
+
+
+@contextmanager
+def paused_gc():
+    # (un)pickling an AST allocates many small objects that are all still
+    # live at the end, so cyclic collections during it are pure overhead
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class ArtifactCache:
+    """Per-script artifacts keyed by a hash of the Lox source.
+
+    The `maxsize` most recently used entries are kept in memory and, when
+    `directory` is set, written to disk much like `__pycache__`. The key
+    also covers `version`, `options` and the Python implementation, so an
+    upgrade invalidates old entries by itself.
+    On disk an entry is named after `script` and `options` when a script is
+    set, so a new version of the script replaces the old file; the key is
+    stored in the file and checked on load. Without a script the file is
+    named by the key.
+    Subclasses pick the artifact, its file suffix and how it is stored.
+    """
+
+    version = CACHE_VERSION
+    suffix = ".loxc"
+
+    def __init__(self, directory: str = None, maxsize: int = 256):
+        self.directory = directory
+        self.script: Optional[str] = None
+        self.maxsize = maxsize
+        self.entries: OrderedDict[str, Any] = OrderedDict()
+        # anything besides the source that changes the artifact, like flags
+        self.options = ""
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: str) -> str:
+        digest = hashlib.sha256(source.encode("utf-8"))
+        digest.update(f"{self.version}:{sys.implementation.cache_tag}:{self.options}".encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        if self.script is None:
+            return os.path.join(self.directory, key + self.suffix)
+        name = f"{self.script}.{self.options}" if self.options else self.script
+        return os.path.join(self.directory, name + self.suffix)
+
+    def dump(self, artifact, file):
+        file.write(artifact)
+
+    def load(self, file):
+        return file.read()
+
+    def get(self, source: str) -> Optional[Any]:
+        key = self.key(source)
+        artifact = self.entries.get(key)
+        if artifact is not None:
+            self.entries.move_to_end(key)
+        elif self.directory:
+            try:
+                with open(self.path(key), "rb") as file:
+                    # written for another version of the script, or truncated
+                    if file.read(len(key) + 1) == key.encode() + b"\n":
+                        artifact = self.load(file)
+            except (OSError, EOFError, ValueError, TypeError):
+                artifact = None
+            if artifact is not None:
+                self.remember(key, artifact)
+        if artifact is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return artifact
+
+    def remember(self, key: str, artifact):
+        self.entries[key] = artifact
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def put(self, source: str, artifact):
+        key = self.key(source)
+        self.remember(key, artifact)
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp = self.path(key) + f".{os.getpid()}.tmp"
+            with open(temp, "wb") as file:
+                file.write(key.encode() + b"\n")
+                self.dump(artifact, file)
+            os.replace(temp, self.path(key))
+        except OSError:
+            pass
+
+    def stats(self) -> str:
+        return f"cache: {self.hits} hits, {self.misses} misses"
+
+
+class ResolutionLog:
+    """Stands in for the engine while resolving and records every call."""
+
+    def __init__(self, engine, resolutions: list):
+        self.engine = engine
+        self.resolutions = resolutions
+
+    def resolve(self, expr, depth: int, slot: int):
+        self.resolutions.append((expr, depth, slot))
+        self.engine.resolve(expr, depth, slot)
+
+
+class ProgramCache(ArtifactCache):
+    """Resolved programs, pickled to `.loxc` files.
+
+    An entry is the statement list plus the resolver's (expr, depth, slot)
+    calls. Loading replays those calls into the engine, so a hit skips
+    scanning, parsing and resolving with any engine. Entries are unpickled
+    on every load and never shared between runs.
+    """
+
+    def fetch(self, source: str, engine) -> Optional[list[Stmt]]:
+        data = self.get(source)
+        if data is None:
+            return None
+        try:
+            with paused_gc():
+                statements, resolutions = pickle.loads(data)
+        except Exception:
+            # truncated, or written by an incompatible build
+            del self.entries[self.key(source)]
+            self.hits -= 1
+            self.misses += 1
+            return None
+        for expr, depth, slot in resolutions:
+            engine.resolve(expr, depth, slot)
+        return statements
+
+    def store(self, source: str, engine, statements: list[Stmt], resolutions: list):
+        try:
+            with paused_gc():
+                data = pickle.dumps((statements, resolutions), pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError):
+            # very deeply nested code; just run it uncached
+            return statements
+        self.put(source, data)
+        return statements
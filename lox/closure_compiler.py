@@ -0,0 +1,388 @@
+from typing import Any, Callable
+
+from .token import Token
+from .token_type import TokenType
+from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
+from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
+from .environment import Environment, GlobalEnvironment
+from .interpreter import Interpreter
+from .lox_callable import LoxCallable, Clock
+from .runtime import is_truthy, is_equal, stringify
+from .output import StreamOutput
+
+# An expression compiles to `fn(env) -> value`. A statement compiles to
+# `fn(env) -> None` on normal completion, or `(value,)` when it executed a
+# `return`, so returns unwind through plain Python returns.
+ExprFn = Callable[[Environment], Any]
+StmtFn = Callable[[Environment], Any]
+
+RuntimeError = Interpreter.RuntimeError
+
+
+class ClosureFunction(LoxCallable):
+    def __init__(self, declaration: Function, body: StmtFn, closure: Environment):
+        self.declaration = declaration
+        self.arity_ = len(declaration.params)
+        self.body = body
+        self.closure = closure
+
+    def call(self, interpreter, arguments: list):
+        completion = self.body(Environment(self.closure, list(arguments)))
+        if completion is not None:
+            return completion[0]
+        return None
+
+    def arity(self):
+        return self.arity_
+
+    def __str__(self):
+        return "<fn " + self.declaration.name.lexeme + ">"
+
+
+def _number_error(op: Token):
+    return RuntimeError(f"{op} Operands must be a number.")
+
+
+class ClosureCompiler(Expr.Visitor, Stmt.Visitor):
+    """Turns a resolved AST into a tree of specialised Python closures.
+
+    Each node is visited once, up front. The closures call their children
+    directly, so running the program never goes through `accept()` or
+    re-dispatches on the operator type the way `Interpreter` does.
+    """
+
+    def __init__(self, engine: "ClosureInterpreter"):
+        self.engine = engine
+        self._locals = engine._locals
+        self.globals = engine._globals
+
+    def compile_stmt(self, stmt: Stmt) -> StmtFn:
+        return stmt.accept(self)
+
+    def compile_expr(self, expr: Expr) -> ExprFn:
+        return expr.accept(self)
+
+    def compile_block(self, statements: list[Stmt]) -> StmtFn:
+        fns = [self.compile_stmt(s) for s in statements]
+        if not fns:
+            return lambda env: None
+        if len(fns) == 1:
+            return fns[0]
+        if len(fns) == 2:
+            first, second = fns
+            def run_pair(env):
+                completion = first(env)
+                if completion is not None:
+                    return completion
+                return second(env)
+            return run_pair
+
+        def run_block(env):
+            for fn in fns:
+                completion = fn(env)
+                if completion is not None:
+                    return completion
+            return None
+        return run_block
+
+    # ================================ Stmt.Visitor ================================
+    def visit_expression_stmt(self, stmt: Expression):
+        expression = self.compile_expr(stmt.expression)
+        def run(env):
+            expression(env)
+        return run
+
+    def visit_print_stmt(self, stmt: Print):
+        expression = self.compile_expr(stmt.expression)
+        engine = self.engine
+        def run(env):
+            engine.output.write(stringify(expression(env)))
+        return run
+
+    def visit_var_stmt(self, stmt: Var):
+        name = stmt.name.lexeme
+        if stmt.initializer is None:
+            def declare(env):
+                env.define(name, None)
+            return declare
+
+        initializer = self.compile_expr(stmt.initializer)
+        def define(env):
+            env.define(name, initializer(env))
+        return define
+
+    def visit_block_stmt(self, stmt: Block):
+        body = self.compile_block(stmt.statements)
+        def run(env):
+            return body(Environment(env))
+        return run
+
+    def visit_if_stmt(self, stmt: If):
+        condition = self.compile_expr(stmt.condition)
+        then_branch = self.compile_stmt(stmt.then_branch)
+        if stmt.else_branch is None:
+            def run_if(env):
+                if is_truthy(condition(env)):
+                    return then_branch(env)
+            return run_if
+
+        else_branch = self.compile_stmt(stmt.else_branch)
+        def run_if_else(env):
+            if is_truthy(condition(env)):
+                return then_branch(env)
+            return else_branch(env)
+        return run_if_else
+
+    def visit_while_stmt(self, stmt: While):
+        condition = self.compile_expr(stmt.condition)
+        body = self.compile_stmt(stmt.body)
+        def run(env):
+            while is_truthy(condition(env)):
+                completion = body(env)
+                if completion is not None:
+                    return completion
+        return run
+
+    def visit_function_stmt(self, stmt: Function):
+        name = stmt.name.lexeme
+        body = self.compile_block(stmt.body)
+        def declare(env):
+            env.define(name, ClosureFunction(stmt, body, env))
+        return declare
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is None:
+            return lambda env: (None,)
+        value = self.compile_expr(stmt.value)
+        def run(env):
+            return (value(env),)
+        return run
+
+    # ================================ Expr.Visitor ================================
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        return lambda env: value
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.compile_expr(expr.expression)
+
+    def visit_var_expr(self, expr: Variable):
+        name = expr.name
+        lexeme = name.lexeme
+        distance = expr.depth
+        slot = expr.slot
+        if distance is None:
+            values = self.globals.values
+            def get_global(env):
+                try:
+                    return values[lexeme]
+                except KeyError:
+                    raise RuntimeError(f" {name} Undefined variable {lexeme} .")
+            return get_global
+        if distance == 0:
+            return lambda env: env.values[slot]
+        if distance == 1:
+            return lambda env: env.enclosing.values[slot]
+        if distance == 2:
+            return lambda env: env.enclosing.enclosing.values[slot]
+        return lambda env: env.ancestor(distance).values[slot]
+
+    def visit_assign_expr(self, expr: Assign):
+        name = expr.name
+        lexeme = name.lexeme
+        value = self.compile_expr(expr.value)
+        distance = expr.depth
+        slot = expr.slot
+        if distance is None:
+            values = self.globals.values
+            def set_global(env):
+                result = value(env)
+                if lexeme not in values:
+                    raise RuntimeError(f" {name} Undefined variable {lexeme} .")
+                values[lexeme] = result
+                return result
+            return set_global
+
+        if distance == 0:
+            def set_local(env):
+                result = env.values[slot] = value(env)
+                return result
+            return set_local
+
+        def set_enclosing(env):
+            result = value(env)
+            env.ancestor(distance).values[slot] = result
+            return result
+        return set_enclosing
+
+    def visit_logical_expr(self, expr: Logical):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        if expr.op.type == TokenType.OR:
+            def run_or(env):
+                value = left(env)
+                if is_truthy(value):
+                    return value
+                return right(env)
+            return run_or
+
+        def run_and(env):
+            value = left(env)
+            if not is_truthy(value):
+                return value
+            return right(env)
+        return run_and
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.compile_expr(expr.right)
+        if expr.op.type == TokenType.MINUS:
+            return lambda env: -float(right(env))
+        return lambda env: not is_truthy(right(env))
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        op = expr.op
+        T = op.type
+
+        if T == TokenType.PLUS:
+            def add(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is float and type(b) is float:
+                    return a + b
+                if isinstance(a, str) and isinstance(b, str):
+                    return a + b
+                return str(a) + str(b)
+            return add
+        if T == TokenType.MINUS:
+            def subtract(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                return a - b
+            return subtract
+        if T == TokenType.STAR:
+            def multiply(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                return a * b
+            return multiply
+        if T == TokenType.SLASH:
+            def divide(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                if b == 0.0:
+                    raise RuntimeError("Division by 0")
+                return a / b
+            return divide
+        if T == TokenType.LESS:
+            def less(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                return a < b
+            return less
+        if T == TokenType.LESS_EQUAL:
+            def less_equal(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                return a <= b
+            return less_equal
+        if T == TokenType.GREATER:
+            def greater(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                return a > b
+            return greater
+        if T == TokenType.GREATER_EQUAL:
+            def greater_equal(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is not float or type(b) is not float:
+                    raise _number_error(op)
+                return a >= b
+            return greater_equal
+        if T == TokenType.EQUAL_EQUAL:
+            return lambda env: is_equal(left(env), right(env))
+        if T == TokenType.BANG_EQUAL:
+            return lambda env: not is_equal(left(env), right(env))
+        return lambda env: None
+
+    def visit_call_expr(self, expr: Call):
+        callee = self.compile_expr(expr.callee)
+        arguments = [self.compile_expr(a) for a in expr.arguments]
+        argc = len(arguments)
+        engine = self.engine
+
+        def call(env):
+            function = callee(env)
+            args = [a(env) for a in arguments]
+            if type(function) is ClosureFunction:
+                if argc != function.arity_:
+                    raise RuntimeError(f"Expected {function.arity_} arguments but got {argc}.")
+                completion = function.body(Environment(function.closure, args))
+                if completion is not None:
+                    return completion[0]
+                return None
+
+            if not isinstance(function, LoxCallable):
+                raise RuntimeError("Can only call functions and classes.")
+            if argc != function.arity():
+                raise RuntimeError(f"Expected {function.arity()} arguments but got {argc}.")
+            return function.call(engine, args)
+        return call
+
+
+class ClosureInterpreter:
+    """Engine that runs programs compiled by `ClosureCompiler`."""
+
+    RuntimeError = Interpreter.RuntimeError
+
+    def __init__(self):
+        self._globals = GlobalEnvironment()
+        self._locals = {}
+        self._globals.define("clock", Clock())
+        self.output = StreamOutput()
+
+    def resolve(self, expr: Expr, depth: int, slot: int):
+        self._locals[expr] = (depth, slot)
+        expr.depth = depth
+        expr.slot = slot
+
+    def compile(self, statements: list[Stmt]) -> list[tuple[bool, Callable]]:
+        compiler = ClosureCompiler(self)
+        program = []
+        for stmt in statements:
+            if isinstance(stmt, Expression):
+                program.append((True, compiler.compile_expr(stmt.expression)))
+            else:
+                program.append((False, compiler.compile_stmt(stmt)))
+        return program
+
+    def interpret(self, statements: list[Stmt]):
+        program = self.compile(statements)
+        try:
+            r = None
+            for is_expression, fn in program:
+                value = fn(self._globals)
+                r = value if is_expression else None
+            return r
+        except self.RuntimeError:
+            raise
+        except RecursionError:
+            raise self.RuntimeError("Stack overflow.")
+        except Exception as e:
+            raise self.RuntimeError(e)
+        finally:
+            self.output.flush()
@@ -0,0 +1,488 @@
+import math
+from enum import IntEnum, auto
+from typing import Any
+
+from .token import Token
+from .token_type import TokenType
+from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
+from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
+
+
+class OpCode(IntEnum):
+    CONSTANT = auto()
+    NIL = auto()
+    TRUE = auto()
+    FALSE = auto()
+    POP = auto()
+    POPN = auto()
+
+    GET_LOCAL = auto()
+    SET_LOCAL = auto()
+    GET_CELL = auto()
+    SET_CELL = auto()
+    MAKE_CELL = auto()
+    GET_UPVALUE = auto()
+    SET_UPVALUE = auto()
+    GET_GLOBAL = auto()
+    SET_GLOBAL = auto()
+    DEFINE_GLOBAL = auto()
+
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    NOT = auto()
+    NEGATE = auto()
+
+    PRINT = auto()
+    JUMP = auto()
+    POP_JUMP_IF_FALSE = auto()
+    JUMP_IF_FALSE_OR_POP = auto()
+    JUMP_IF_TRUE_OR_POP = auto()
+    CALL = auto()
+    TAIL_CALL = auto()
+    CLOSURE = auto()
+    RETURN = auto()
+
+
+BINARY_OPS = {
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+}
+
+
+class FunctionProto:
+    """A compiled function body: instructions plus its constant pool.
+
+    `code` holds `(opcode, operand)` pairs. Constants and nested protos are
+    referenced by pool index, globals by name, and jump operands are absolute
+    instruction indexes. `tokens` runs parallel to `code` and keeps the source
+    token behind each instruction for runtime error messages. `captures`
+    lists what a CLOSURE of this proto copies from the creating frame, as
+    `(is_local, index)` pairs in the style of clox upvalues.
+    """
+
+    def __init__(self, name: str, arity: int):
+        self.name = name
+        self.arity = arity
+        self.code: list[tuple[int, Any]] = []
+        self.constants: list[Any] = []
+        self.tokens: list[Token] = []
+        self.captures: list[tuple[bool, int]] = []
+
+    def __str__(self):
+        return "<fn " + self.name + ">"
+
+
+class _Scope:
+    def __init__(self, owner: "_FunctionState"):
+        self.owner = owner
+        # name -> (slot, is_cell)
+        self.names: dict[str, tuple[int, bool]] = {}
+
+
+class _FunctionState:
+    def __init__(self, proto: FunctionProto, enclosing: "_FunctionState"):
+        self.proto = proto
+        self.enclosing = enclosing
+        self.local_count = 0
+        self.upvalues: dict[tuple[bool, int], int] = {}
+        self.constant_index: dict[tuple[type, Any], int] = {}
+
+
+class CaptureFinder(Expr.Visitor, Stmt.Visitor):
+    """Finds the local declarations that nested functions close over.
+
+    The compiler stores those locals in cells so closures can share them;
+    everything else stays a plain stack slot. Scopes mirror the Resolver's so
+    the resolved depths in `_locals` index straight into them.
+    """
+
+    def __init__(self, locals_: dict):
+        self._locals = locals_
+        self.scopes: list[tuple[int, dict]] = []
+        self.function_depth = 0
+        self.captured: set[int] = set()
+
+    def find(self, statements: list[Stmt]) -> set[int]:
+        for s in statements:
+            s.accept(self)
+        return self.captured
+
+    def declare(self, name: Token, key: Any):
+        if self.scopes:
+            self.scopes[-1][1][name.lexeme] = id(key)
+
+    def reference(self, expr: Expr, name: Token):
+        depth = self._locals.get(expr)
+        if depth is None:
+            return
+        function_depth, names = self.scopes[len(self.scopes) - 1 - depth]
+        if function_depth != self.function_depth:
+            self.captured.add(names[name.lexeme])
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append((self.function_depth, {}))
+        for s in stmt.statements:
+            s.accept(self)
+        self.scopes.pop()
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer:
+            stmt.initializer.accept(self)
+        self.declare(stmt.name, stmt)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(stmt.name, stmt)
+        self.function_depth += 1
+        self.scopes.append((self.function_depth, {}))
+        for param in stmt.params:
+            self.declare(param, param)
+        for s in stmt.body:
+            s.accept(self)
+        self.scopes.pop()
+        self.function_depth -= 1
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value:
+            stmt.value.accept(self)
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch:
+            stmt.else_branch.accept(self)
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def visit_var_expr(self, expr: Variable):
+        self.reference(expr, expr.name)
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        self.reference(expr, expr.name)
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_call_expr(self, expr: Call):
+        expr.callee.accept(self)
+        for arg in expr.arguments:
+            arg.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+
+class Compiler(Expr.Visitor, Stmt.Visitor):
+    """Lowers resolved statements to bytecode for `lox.vm.VM`.
+
+    Locals live in stack slots addressed relative to the frame base, globals
+    are looked up by name, and variables captured by closures are boxed in
+    one-element list cells. The Resolver's `_locals` table decides which
+    references are local, exactly as it does for the tree walker.
+    """
+
+    def __init__(self, locals_: dict):
+        self._locals = locals_
+        self.captured: set[int] = set()
+        self.scopes: list[_Scope] = []
+        self.state: _FunctionState = None
+        self.token: Token = None
+
+    def compile(self, statements: list[Stmt]) -> FunctionProto:
+        self.captured = CaptureFinder(self._locals).find(statements)
+        self.state = _FunctionState(FunctionProto("script", 0), None)
+
+        # like Interpreter.interpret, the script evaluates to the value of a
+        # trailing expression statement
+        last = statements[-1] if statements else None
+        body = statements[:-1] if isinstance(last, Expression) else statements
+        for s in body:
+            self.compile_stmt(s)
+        if isinstance(last, Expression):
+            self.compile_expr(last.expression)
+        else:
+            self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        return self.state.proto
+
+    # ================================ helpers ================================
+    def compile_stmt(self, stmt: Stmt):
+        stmt.accept(self)
+
+    def compile_expr(self, expr: Expr):
+        expr.accept(self)
+
+    def emit(self, op: OpCode, arg: Any = None) -> int:
+        proto = self.state.proto
+        proto.code.append((int(op), arg))
+        proto.tokens.append(self.token)
+        return len(proto.code) - 1
+
+    def patch(self, index: int, target: int = None):
+        proto = self.state.proto
+        op, _ = proto.code[index]
+        proto.code[index] = (op, len(proto.code) if target is None else target)
+
+    def constant(self, value: Any) -> int:
+        # -0.0 == 0.0, but they print differently
+        key = (type(value), value, math.copysign(1.0, value) if type(value) is float else None)
+        index = self.state.constant_index.get(key)
+        if index is None:
+            constants = self.state.proto.constants
+            constants.append(value)
+            index = len(constants) - 1
+            self.state.constant_index[key] = index
+        return index
+
+    def begin_scope(self):
+        self.scopes.append(_Scope(self.state))
+
+    def end_scope(self):
+        scope = self.scopes.pop()
+        if scope.names:
+            self.emit(OpCode.POPN, len(scope.names))
+            self.state.local_count -= len(scope.names)
+
+    def declare_local(self, name: Token, key: Any) -> tuple[int, bool]:
+        slot = self.state.local_count
+        self.state.local_count += 1
+        entry = (slot, id(key) in self.captured)
+        self.scopes[-1].names[name.lexeme] = entry
+        return entry
+
+    def resolve_upvalue(self, state: _FunctionState, owner: _FunctionState, slot: int) -> int:
+        if state.enclosing is owner:
+            key = (True, slot)
+        else:
+            key = (False, self.resolve_upvalue(state.enclosing, owner, slot))
+        index = state.upvalues.get(key)
+        if index is None:
+            state.proto.captures.append(key)
+            index = len(state.proto.captures) - 1
+            state.upvalues[key] = index
+        return index
+
+    def variable(self, expr: Expr, name: Token, get: bool):
+        self.token = name
+        depth = self._locals.get(expr)
+        if depth is None:
+            op = OpCode.GET_GLOBAL if get else OpCode.SET_GLOBAL
+            self.emit(op, name.lexeme)
+            return
+
+        scope = self.scopes[len(self.scopes) - 1 - depth]
+        slot, is_cell = scope.names[name.lexeme]
+        if scope.owner is self.state:
+            if is_cell:
+                self.emit(OpCode.GET_CELL if get else OpCode.SET_CELL, slot)
+            else:
+                self.emit(OpCode.GET_LOCAL if get else OpCode.SET_LOCAL, slot)
+        else:
+            index = self.resolve_upvalue(self.state, scope.owner, slot)
+            self.emit(OpCode.GET_UPVALUE if get else OpCode.SET_UPVALUE, index)
+
+    # ================================ Stmt.Visitor ================================
+    def visit_expression_stmt(self, stmt: Expression):
+        self.compile_expr(stmt.expression)
+        self.emit(OpCode.POP)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.compile_expr(stmt.expression)
+        self.emit(OpCode.PRINT)
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer:
+            self.compile_expr(stmt.initializer)
+        else:
+            self.emit(OpCode.NIL)
+
+        self.token = stmt.name
+        if not self.scopes:
+            self.emit(OpCode.DEFINE_GLOBAL, stmt.name.lexeme)
+            return
+        slot, is_cell = self.declare_local(stmt.name, stmt)
+        if is_cell:
+            self.emit(OpCode.MAKE_CELL, slot)
+
+    def visit_block_stmt(self, stmt: Block):
+        self.begin_scope()
+        for s in stmt.statements:
+            self.compile_stmt(s)
+        self.end_scope()
+
+    def visit_if_stmt(self, stmt: If):
+        self.compile_expr(stmt.condition)
+        to_else = self.emit(OpCode.POP_JUMP_IF_FALSE)
+        self.compile_stmt(stmt.then_branch)
+        if stmt.else_branch is None:
+            self.patch(to_else)
+            return
+        to_end = self.emit(OpCode.JUMP)
+        self.patch(to_else)
+        self.compile_stmt(stmt.else_branch)
+        self.patch(to_end)
+
+    def visit_while_stmt(self, stmt: While):
+        start = len(self.state.proto.code)
+        self.compile_expr(stmt.condition)
+        to_end = self.emit(OpCode.POP_JUMP_IF_FALSE)
+        self.compile_stmt(stmt.body)
+        self.emit(OpCode.JUMP, start)
+        self.patch(to_end)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.token = stmt.name
+        if not self.scopes:
+            self.function(stmt)
+            self.emit(OpCode.DEFINE_GLOBAL, stmt.name.lexeme)
+            return
+
+        slot, is_cell = self.declare_local(stmt.name, stmt)
+        if is_cell:
+            # the cell has to exist before the closure so it can see itself
+            self.emit(OpCode.NIL)
+            self.emit(OpCode.MAKE_CELL, slot)
+            self.function(stmt)
+            self.emit(OpCode.SET_CELL, slot)
+            self.emit(OpCode.POP)
+        else:
+            self.function(stmt)
+
+    def function(self, stmt: Function):
+        enclosing = self.state
+        self.state = _FunctionState(FunctionProto(stmt.name.lexeme, len(stmt.params)), enclosing)
+        self.begin_scope()
+        for param in stmt.params:
+            slot, is_cell = self.declare_local(param, param)
+            if is_cell:
+                self.token = param
+                self.emit(OpCode.MAKE_CELL, slot)
+        for s in stmt.body:
+            self.compile_stmt(s)
+        self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+        self.scopes.pop()
+        proto = self.state.proto
+        self.state = enclosing
+
+        self.token = stmt.name
+        self.emit(OpCode.CLOSURE, self.constant(proto))
+
+    def visit_return_stmt(self, stmt: Return):
+        value = stmt.value
+        if isinstance(value, Call) and value.tail:
+            # RETURN only runs if the callee turns out not to be a VMFunction
+            self.compile_expr(value.callee)
+            for arg in value.arguments:
+                self.compile_expr(arg)
+            self.token = value.paren
+            self.emit(OpCode.TAIL_CALL, len(value.arguments))
+        elif value is not None:
+            self.compile_expr(value)
+        else:
+            self.emit(OpCode.NIL)
+        self.token = stmt.keyword
+        self.emit(OpCode.RETURN)
+
+    # ================================ Expr.Visitor ================================
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        if value is None:
+            self.emit(OpCode.NIL)
+        elif value is True:
+            self.emit(OpCode.TRUE)
+        elif value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit(OpCode.CONSTANT, self.constant(value))
+
+    def visit_grouping_expr(self, expr: Grouping):
+        self.compile_expr(expr.expression)
+
+    def visit_unary_expr(self, expr: Unary):
+        self.compile_expr(expr.right)
+        self.token = expr.op
+        if expr.op.type == TokenType.MINUS:
+            self.emit(OpCode.NEGATE)
+        else:
+            self.emit(OpCode.NOT)
+
+    def visit_binary_expr(self, expr: Binary):
+        self.compile_expr(expr.left)
+        self.compile_expr(expr.right)
+        self.token = expr.op
+        self.emit(BINARY_OPS[expr.op.type])
+
+    def visit_logical_expr(self, expr: Logical):
+        self.compile_expr(expr.left)
+        self.token = expr.op
+        if expr.op.type == TokenType.OR:
+            jump = self.emit(OpCode.JUMP_IF_TRUE_OR_POP)
+        else:
+            jump = self.emit(OpCode.JUMP_IF_FALSE_OR_POP)
+        self.compile_expr(expr.right)
+        self.patch(jump)
+
+    def visit_var_expr(self, expr: Variable):
+        self.variable(expr, expr.name, get=True)
+
+    def visit_assign_expr(self, expr: Assign):
+        self.compile_expr(expr.value)
+        self.variable(expr, expr.name, get=False)
+
+    def visit_call_expr(self, expr: Call):
+        self.compile_expr(expr.callee)
+        for arg in expr.arguments:
+            self.compile_expr(arg)
+        self.token = expr.paren
+        self.emit(OpCode.CALL, len(expr.arguments))
+
+
+def disassemble(proto: FunctionProto) -> str:
+    lines = [f"== {proto.name} =="]
+    for i, (op, arg) in enumerate(proto.code):
+        token = proto.tokens[i]
+        line = token.line if token else "-"
+        operand = "" if arg is None else f" {arg}"
+        if op == OpCode.CONSTANT:
+            operand += f" ({proto.constants[arg]!r})"
+        lines.append(f"{i:04d} {line:>4} {OpCode(op).name}{operand}")
+    for const in proto.constants:
+        if isinstance(const, FunctionProto):
+            lines.append(disassemble(const))
+    return "\n".join(lines)
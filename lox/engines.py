@@ -0,0 +1,13 @@
+from .interpreter import Interpreter
+from .vm import VM
+from .closure_compiler import ClosureInterpreter
+from .transpiler import PythonEngine
+
+# Execution engines selectable with `python -m lox --engine=NAME`. Each takes
+# resolved statements through `resolve()` / `interpret()` like Interpreter.
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "vm": VM,
+    "python": PythonEngine,
+}
@@ -1,47 +1,71 @@
-
 from typing import Any
 from .token import Token
 
 class Environment:
+    """A local scope: values live in a list indexed by the resolver's slot.
+
+    The Resolver numbers each scope's declarations in order, and `define`
+    appends, so `values[slot]` is the variable without any name lookup.
+    """
+
+    __slots__ = ("values", "enclosing")
 
     class EnvException(Exception):
         pass
 
-    def __init__(self, enclosing=None):
-        self.values = {}
+    def __init__(self, enclosing=None, values: list = None):
+        self.values: list = [] if values is None else values
         self.enclosing: "Environment" = enclosing
     
     def define(self, name: str, value: Any):
         # print(f"define: {name} = {value} : {self.enclosing}")
+        self.values.append(value)
+
+    def get_at(self, distance: int, slot: int):
+        env = self
+        while distance:
+            env = env.enclosing
+            distance -= 1
+        return env.values[slot]
+
+    def assign_at(self, distance: int, slot: int, value: Any):
+        env = self
+        while distance:
+            env = env.enclosing
+            distance -= 1
+        env.values[slot] = value
+
+    def ancestor(self, distance: int) -> "Environment":
+        env = self
+        for i in range(distance):
+            env = env.enclosing
+        return env
+
+
+class GlobalEnvironment(Environment):
+    """The outermost scope. Globals are late bound, so they stay keyed by name."""
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(None, {})
+
+    def define(self, name: str, value: Any):
         self.values[name] = value
-    
+
+    def replace(self, values: dict):
+        self.values.clear()
+        self.values.update(values)
+
     def get(self, name: Token) -> Any:
         if name.lexeme in self.values:
             return self.values[name.lexeme]
-        elif self.enclosing: 
-            return self.enclosing.get(name)
         else:
             raise self.EnvException(f" {name} Undefined variable {name.lexeme} .")
 
-    def get_at(self, distance: int, name: str):
-        return self.ancestor(distance).values[name]
-
-    def assign_at(self, distance: int, name: Token, value: Any):
-        self.ancestor(distance).values[name] = value
-
     def assign(self, name: Token, value: Any):
         # print(f"assign: {name.lexeme} = {value} : {self.enclosing}")
-        print(f"Looking up '{name.lexeme}' in {self.values}")
-
         if name.lexeme in self.values:
             self.values[name.lexeme] = value
-        elif self.enclosing: 
-            self.enclosing.assign(name, value)
         else:
             raise self.EnvException(f" {name} Undefined variable {name.lexeme} .")
-    
-    def ancestor(self, distance: int) -> "Environment":
-        env = self
-        for i in range(distance):
-            env = env.enclosing
-        return env
\ No newline at end of file
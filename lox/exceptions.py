@@ -4,8 +4,11 @@ from .token_type import TokenType
 
 # class Error(Exception):
 #     def __init__(self, token: Token, msg: str):
-def error_report(token: Token, msg: str):
+def error_message(token: Token, msg: str) -> str:
     if token.type  == TokenType.EOF:
-        print(f"{token.line} at end {msg}")
+        return f"{token.line} at end {msg}"
     else:
-        print(f"{token.line} at {token.lexeme} {msg}")
+        return f"{token.line} at {token.lexeme} {msg}"
+
+def error_report(token: Token, msg: str):
+    print(error_message(token, msg))
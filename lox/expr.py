@@ -1,7 +1,6 @@
 from abc import ABC
 
 from .token import Token
-from copy import deepcopy
 
 class Expr(ABC):
     class Visitor(ABC):
@@ -18,6 +17,23 @@ class Expr(ABC):
         def visit_unary_expr(self, expr): raise NotImplementedError()
         def visit_var_expr(self, expr): raise NotImplementedError()
 
+        # Binary nodes the tree walker has quickened (see Interpreter.quicken);
+        # to any other visitor they are the Binary nodes they started as
+        def visit_add_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_concat_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_subtract_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_multiply_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_divide_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_less_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_less_equal_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_greater_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_greater_equal_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_equal_float_expr(self, expr): return self.visit_binary_expr(expr)
+        def visit_not_equal_float_expr(self, expr): return self.visit_binary_expr(expr)
+
+    # nodes are numerous and never grow new attributes, so none carry a __dict__
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -26,23 +42,33 @@ class Expr(ABC):
 
 
 class Assign(Expr):
+    __slots__ = ("name", "value", "depth", "slot")
+
     def __init__(self, name: Token, value: Expr):
         self.name = name
         self.value = value
+        # filled in by Interpreter.resolve; depth None means global
+        self.depth: int = None
+        self.slot: int = None
     
     def accept(self, visitor: Expr.Visitor):
         return visitor.visit_assign_expr(self)
 
 class Call(Expr):
+    __slots__ = ("callee", "paren", "arguments", "tail")
+
     def __init__(self, callee: Expr, paren: Token, arguments: list[Expr]):
         self.callee = callee
         self.paren = paren
         self.arguments = arguments
+        # set by the Resolver when the call is the value of a `return`
+        self.tail = False
     
     def accept(self, visitor: Expr.Visitor):
         return visitor.visit_call_expr(self)
 
 class Binary(Expr):
+    __slots__ = ("left", "op", "right")
 
     def __init__(self, left: Expr, op: Token, right: Expr):
         self.left = left
@@ -52,7 +78,82 @@ class Binary(Expr):
     def accept(self, visitor: Expr.Visitor):
         return visitor.visit_binary_expr(self)
 
+
+# Quickened forms of Binary. The Interpreter swaps a node's __class__ to one
+# of these once it has seen the operand types, and to GenericBinary when no
+# specialization fits or one has failed. Same slots, so the swap is free.
+
+class GenericBinary(Binary):
+    __slots__ = ()
+
+class AddFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_add_float_expr(self)
+
+class Concat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_concat_expr(self)
+
+class SubtractFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_subtract_float_expr(self)
+
+class MultiplyFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_multiply_float_expr(self)
+
+class DivideFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_divide_float_expr(self)
+
+class LessFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_less_float_expr(self)
+
+class LessEqualFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_less_equal_float_expr(self)
+
+class GreaterFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_greater_float_expr(self)
+
+class GreaterEqualFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_greater_equal_float_expr(self)
+
+class EqualFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_equal_float_expr(self)
+
+class NotEqualFloat(Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: Expr.Visitor):
+        return visitor.visit_not_equal_float_expr(self)
+
 class Unary(Expr):
+    __slots__ = ("op", "right")
 
     def __init__(self, op: Token, right: Expr):
         self.op = op
@@ -62,13 +163,18 @@ class Unary(Expr):
         return visitor.visit_unary_expr(self)
 
 class Literal(Expr):
+    __slots__ = ("value",)
+
     def __init__(self, value):
-        # not sure if this is needed or not
-        self.value = deepcopy(value)
+        # Lox values are immutable, so literals can share them; the Parser
+        # hands out pooled constants rather than copies
+        self.value = value
     def accept(self, visitor):
         return visitor.visit_literal_expr(self)
 
 class Logical(Expr):
+    __slots__ = ("left", "op", "right")
+
     def __init__(self, left: Expr, op: Token, right: Expr):
         self.left = left
         self.op = op
@@ -78,14 +184,21 @@ class Logical(Expr):
         return visitor.visit_logical_expr(self)
 
 class Grouping(Expr):
+    __slots__ = ("expression",)
+
     def __init__(self, expression):
         self.expression = expression
     def accept(self, visitor):
         return visitor.visit_grouping_expr(self)
 
 class Variable(Expr):
+    __slots__ = ("name", "depth", "slot")
+
     def __init__(self, name: Token):
         self.name = name
+        # filled in by Interpreter.resolve; depth None means global
+        self.depth: int = None
+        self.slot: int = None
 
     def accept(self, visitor):
         return visitor.visit_var_expr(self)
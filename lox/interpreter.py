@@ -1,42 +1,146 @@
+import time
+from collections import Counter
 from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
+from .expr import (GenericBinary, AddFloat, Concat, SubtractFloat, MultiplyFloat, DivideFloat,
+                   LessFloat, LessEqualFloat, GreaterFloat, GreaterEqualFloat, EqualFloat, NotEqualFloat)
 from .token import Token
 from .token_type import TokenType
 from typing import Any
 from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
-from .environment import Environment
+from .environment import Environment, GlobalEnvironment
 from .lox_callable import LoxCallable, Clock
-from .lox_function import LoxFunction
-
+from .lox_function import LoxFunction, MemoizedFunction, TailCall, TAIL_CALLABLE
+from .memo import MemoCache
+from .purity import PurityAnalysis
+from .output import StreamOutput
+from .rope import ROPE_MIN, Rope, concat, text, flatten
+from . import runtime
+
+# (operator, left type, right type) -> the class a Binary node is quickened to
+QUICKENED = {
+    (TokenType.PLUS, float, float): AddFloat,
+    (TokenType.PLUS, str, str): Concat,
+    (TokenType.PLUS, Rope, str): Concat,
+    (TokenType.PLUS, str, Rope): Concat,
+    (TokenType.PLUS, Rope, Rope): Concat,
+    (TokenType.MINUS, float, float): SubtractFloat,
+    (TokenType.STAR, float, float): MultiplyFloat,
+    (TokenType.SLASH, float, float): DivideFloat,
+    (TokenType.LESS, float, float): LessFloat,
+    (TokenType.LESS_EQUAL, float, float): LessEqualFloat,
+    (TokenType.GREATER, float, float): GreaterFloat,
+    (TokenType.GREATER_EQUAL, float, float): GreaterEqualFloat,
+    (TokenType.EQUAL_EQUAL, float, float): EqualFloat,
+    (TokenType.BANG_EQUAL, float, float): NotEqualFloat,
+}
+
+# loop iterations and calls run between checks of the step budget and deadline
+FUEL = 10000
 
 class Interpreter(Expr.Visitor, Stmt.Visitor):
     class RuntimeError(Exception):
         pass
 
+    class BudgetExceeded(RuntimeError):
+        """A run used up its step budget or passed its deadline; see limit()."""
+
+    # the class of every block and call frame; see lox/meter.py
+    Environment = Environment
+
+    # No longer raised: `return` now travels back as a completion (see
+    # visit_return_stmt). Kept so code that catches it still imports.
     class Return(Exception):
         def __init__(self, value):
             self.value = value
     
     def __init__(self):
-        self._globals = Environment()
+        self._globals = GlobalEnvironment()
         self.environment = self._globals
         self._locals = {}
         self._globals.define("clock", Clock())
+        # pure functions to memoize, with their caches; see memoize()
+        self.memoized: dict[Function, MemoCache] = {}
+        self.memo_size = 1024
+        # a LoopJit compiles hot while loops when installed; see lox/jit.py
+        self.jit = None
+        # Binary nodes quickened and deoptimized, by class name
+        self.quickened = Counter()
+        self.deoptimized = Counter()
+        # every loop iteration and call takes one step of fuel; refuel()
+        # checks the limits whenever it runs out
+        self.fuel = self.issued = FUEL
+        self.steps = 0
+        self.max_steps = None
+        self.timeout = None
+        self.deadline = None
+        self.limited = False
+        # printed lines go here; see lox/output.py
+        self.output = StreamOutput()
 
     def interpret(self, statements: list[Stmt]):
-        # try:
         try:
             r = 0
             for statement in statements:
-                r = self.execute(statement)
-            return r
+                # statements only report how they completed; the value of an
+                # expression statement is wanted just here
+                if isinstance(statement, Expression):
+                    r = self.evaluate(statement.expression)
+                else:
+                    r = self.execute(statement)
+            return flatten(r)
+        except RecursionError:
+            # each Lox call nests several Python frames here; the vm engine
+            # keeps Lox frames off the Python stack
+            raise self.RuntimeError("Stack overflow.")
+        except self.BudgetExceeded:
+            raise
         except Exception as e:
             raise self.RuntimeError(e)
+        finally:
+            self.output.flush()
     
+    def limit(self, steps: int = None, seconds: float = None):
+        """Stops runs with BudgetExceeded after `steps` more loop iterations
+        and calls, or `seconds` from now, whichever comes first. The deadline
+        is only looked at every FUEL steps. limit() lifts both."""
+        self.max_steps = steps
+        self.timeout = seconds
+        self.limited = steps is not None or seconds is not None
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+        self.steps = 0
+        self.fuel = self.issued = FUEL if steps is None else min(FUEL, steps)
+
+    def refuel(self):
+        # the step that found the fuel gone counts against the next issue
+        steps = self.steps + self.issued
+        if self.max_steps is not None and steps >= self.max_steps:
+            raise self.BudgetExceeded(f"Step budget of {self.max_steps} exhausted.")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise self.BudgetExceeded(f"Timed out after {self.timeout} seconds.")
+        self.steps = steps
+        self.issued = FUEL if self.max_steps is None else min(FUEL, self.max_steps - self.steps)
+        self.fuel = self.issued - 1
+
+    def steps_used(self) -> int:
+        return self.steps + self.issued - self.fuel
+
+    def memoize(self, statements: list[Stmt]):
+        """Caches results of the pure top-level functions in a whole,
+        resolved script."""
+        for function in PurityAnalysis(self._locals).pure_functions(statements):
+            self.memoized.setdefault(function, MemoCache(self.memo_size))
+
+    def memo_stats(self) -> list[str]:
+        return [f"{function.name.lexeme}: {memo.stats()}" for function, memo in self.memoized.items()]
+
     def execute(self, stmt: Stmt):
+        # None on normal completion, `(value,)` once a `return` has run
         return stmt.accept(self)
     
-    def resolve(self, expr: Expr, depth: int):
-        self._locals[expr] = depth
+    def resolve(self, expr: Expr, depth: int, slot: int):
+        self._locals[expr] = (depth, slot)
+        expr.depth = depth
+        expr.slot = slot
 
     
     def execute_block(self, statements: list[Stmt], environment: Environment):
@@ -45,7 +149,9 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         self.environment = environment
         try:
             for statement in statements:
-                self.execute(statement)
+                completion = statement.accept(self)
+                if completion is not None:
+                    return completion
         # horrid edge case
         finally:
             self.environment = previous
@@ -53,26 +159,21 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
 
 
     def visit_block_stmt(self, stmt: Block):
-        self.execute_block(stmt.statements, Environment(self.environment))
-        return None
+        return self.execute_block(stmt.statements, self.Environment(self.environment))
 
 
-    def stringify(self, ob):
-        if ob is None:
-            return 'nil'
-        elif isinstance(ob, float):
-            text = str(ob)
-            if text.endswith(".0"):
-                text = text[0 : len(text) - 2]
-            return text
-        else:
-            return str(ob)
+    stringify = staticmethod(runtime.stringify)
 
 
     # ================================ Expr.Visitor ================================
     def visit_binary_expr(self, expr: Binary) -> Any:
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
+        if type(expr) is Binary:
+            self.quicken(expr, left, right)
+        return self.binary(expr, left, right)
+
+    def binary(self, expr: Binary, left: Any, right: Any) -> Any:
         T = expr.op.type
         if T == TokenType.GREATER:
             self.check_number_operand_3(expr.op, left, right)
@@ -100,32 +201,130 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         if T == TokenType.PLUS:
             if isinstance(left, float) and isinstance(right, float):
                 return left + right
-            if isinstance(left, str) and isinstance(right, str):
-                return left + right
             else:
-                return str(left) + str(right)
-                raise self.RuntimeError(f"{expr} Operands must be two numbers or two strings.") 
+                return concat(text(left), text(right))
         if T == TokenType.BANG_EQUAL:
             return not self.is_equal(left, right)
         if T == TokenType.EQUAL_EQUAL:
             return self.is_equal(left, right)
         return None
 
+    def quicken(self, expr: Binary, left: Any, right: Any):
+        quickened = QUICKENED.get((expr.op.type, type(left), type(right)), GenericBinary)
+        expr.__class__ = quickened
+        self.quickened[quickened.__name__] += 1
+
+    def deoptimize(self, expr: Binary, left: Any, right: Any) -> Any:
+        self.deoptimized[type(expr).__name__] += 1
+        expr.__class__ = GenericBinary
+        return self.binary(expr, left, right)
+
+    def quicken_stats(self) -> list[str]:
+        return [f"{name}: {count} quickened, {self.deoptimized[name]} deoptimized"
+                for name, count in sorted(self.quickened.items())]
+
+    # Quickened Binary nodes: one guard on the operand types they were
+    # quickened for, and deoptimize() when it fails. Operands are evaluated
+    # with accept() directly to save a frame.
+    def visit_add_float_expr(self, expr: AddFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left + right
+        return self.deoptimize(expr, left, right)
+
+    def visit_concat_expr(self, expr: Concat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is str and len(left) + len(right) < ROPE_MIN:
+            return left + right
+        if (type(left) is str or type(left) is Rope) and (type(right) is str or type(right) is Rope):
+            return concat(left, right)
+        return self.deoptimize(expr, left, right)
+
+    def visit_subtract_float_expr(self, expr: SubtractFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left - right
+        return self.deoptimize(expr, left, right)
+
+    def visit_multiply_float_expr(self, expr: MultiplyFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left * right
+        return self.deoptimize(expr, left, right)
+
+    def visit_divide_float_expr(self, expr: DivideFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        # a zero divisor takes the generic path too, which reports it
+        if type(left) is type(right) is float and right != 0.0:
+            return left / right
+        return self.deoptimize(expr, left, right)
+
+    def visit_less_float_expr(self, expr: LessFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left < right
+        return self.deoptimize(expr, left, right)
+
+    def visit_less_equal_float_expr(self, expr: LessEqualFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left <= right
+        return self.deoptimize(expr, left, right)
+
+    def visit_greater_float_expr(self, expr: GreaterFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left > right
+        return self.deoptimize(expr, left, right)
+
+    def visit_greater_equal_float_expr(self, expr: GreaterEqualFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left >= right
+        return self.deoptimize(expr, left, right)
+
+    def visit_equal_float_expr(self, expr: EqualFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left == right
+        return self.deoptimize(expr, left, right)
+
+    def visit_not_equal_float_expr(self, expr: NotEqualFloat):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+        if type(left) is type(right) is float:
+            return left != right
+        return self.deoptimize(expr, left, right)
+
     def visit_call_expr(self, expr: Call):
         callee = self.evaluate(expr.callee)
 
         arguments = []
         for arg in expr.arguments:
             arguments.append(self.evaluate(arg))
-        
+
+        return self.call(callee, arguments)
+
+    def call(self, callee: Any, arguments: list):
         if not isinstance(callee, LoxCallable):
             raise self.RuntimeError("Can only call functions and classes.")
         
         function: LoxCallable = callee
         if len(arguments) != function.arity():
-            raise self.RuntimeError("Expected " +
-                function.arity() + " arguments but got " +
-                len(arguments) + ".")
+            raise self.RuntimeError(f"Expected {function.arity()} arguments but got {len(arguments)}.")
+        if not isinstance(function, LoxFunction):
+            # natives are Python and see plain strings
+            arguments = [flatten(argument) for argument in arguments]
 
         return function.call(self, arguments)
         
@@ -156,11 +355,16 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         return self.evaluate(expr.right)
     
     def visit_while_stmt(self, stmt: While):
-        
+        if self.jit is not None:
+            return self.jit.run(stmt)
         while self.is_truthy(self.evaluate(stmt.condition)):
-            
-            self.execute(stmt.body)
-        
+            self.fuel -= 1
+            if self.fuel < 0:
+                self.refuel()
+            completion = self.execute(stmt.body)
+            if completion is not None:
+                return completion
+
         return None
     
 
@@ -184,24 +388,8 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
     def evaluate(self, expr: Grouping) -> Expr:
         return expr.accept(self)
 
-    def is_truthy(self, ob):
-        # TODO: check this is true in pythonx
-        if ob is None:
-            return False
-        if ob == 0.0 or ob == 0:
-            return False
-        if isinstance(ob, bool):
-            return bool(ob)
-        else:
-            return True
-        
-    def is_equal(self, a, b):
-        if a is None and b is None:
-            return True
-        elif a == None:
-            return False
-        else:
-            return a == b
+    is_truthy = staticmethod(runtime.is_truthy)
+    is_equal = staticmethod(runtime.is_equal)
 
     def check_number_operand(self, op: Token, operand: Any):
         if isinstance(operand, float):
@@ -217,30 +405,43 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
     # ================================ Stmt.Visitor ================================
 
     def visit_expression_stmt(self, stmt: Expression):
-        return self.evaluate(stmt.expression)
+        self.evaluate(stmt.expression)
+        return None
     
     def visit_function_stmt(self, stmt: Function):
-        function = LoxFunction(stmt, self.environment)
+        memo = self.memoized.get(stmt)
+        if memo is None:
+            function = LoxFunction(stmt, self.environment)
+        else:
+            function = MemoizedFunction(stmt, self.environment, memo)
         self.environment.define(stmt.name.lexeme, function)
         return None
     
     def visit_if_stmt(self, stmt: If):
         if self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return self.execute(stmt.then_branch)
         elif stmt.else_branch != None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
         return None
 
     def visit_print_stmt(self, stmt: Print):
         value = self.evaluate(stmt.expression)
-        print(self.stringify(value))
+        self.output.write(self.stringify(value))
         return None
 
     def visit_return_stmt(self, stmt: Return):
         value = None
+        call = stmt.value
+        if type(call) is Call and call.tail:
+            callee = self.evaluate(call.callee)
+            arguments = [self.evaluate(arg) for arg in call.arguments]
+            if type(callee) in TAIL_CALLABLE and len(arguments) == len(callee.declaration.params):
+                # LoxFunction.call runs it in place of the current activation
+                return TailCall(callee, arguments)
+            return (self.call(callee, arguments),)
         if stmt.value != None:
             value = self.evaluate(stmt.value)
-        raise self.Return(value)
+        return (value,)
     
     def visit_var_stmt(self, stmt: Var):
         value = None
@@ -253,11 +454,11 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
     def visit_assign_expr(self, expr: Assign):
         value = self.evaluate(expr.value)
         # self.environment.assign(expr.name, value)
-        distance = self._locals.get(expr)
-        if distance:
-            self.environment.assign_at(distance, expr.name, value)
+        distance = expr.depth
+        if distance is not None:
+            self.environment.assign_at(distance, expr.slot, value)
         else:
-            self._globals[expr.name] = value
+            self._globals.assign(expr.name, value)
         return value
 
     def visit_var_expr(self, expr: Variable):
@@ -266,8 +467,13 @@ class Interpreter(Expr.Visitor, Stmt.Visitor):
         # return self.environment.get(expr.name)
 
     def lookup_variable(self, name: Token, expr: Expr):
-        distance = self._locals.get(expr)
+        distance = expr.depth
         if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
+            # Environment.get_at, inlined for the hot path
+            env = self.environment
+            while distance:
+                env = env.enclosing
+                distance -= 1
+            return env.values[expr.slot]
         else:
             return self._globals.get(name)
@@ -0,0 +1,571 @@
+import math
+import operator
+from typing import Any, Optional
+
+from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
+from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
+from .token_type import TokenType
+from .interpreter import Interpreter
+from .lox_function import TailCall, TAIL_CALLABLE
+from .rope import concat, text
+from . import runtime
+
+# what a compiled loop returns when a guard fails: the tree walker takes over
+# at the top of the current iteration
+DEOPT = object()
+
+NUMERIC = {
+    TokenType.MINUS: ("-", operator.sub),
+    TokenType.STAR: ("*", operator.mul),
+    TokenType.GREATER: (">", operator.gt),
+    TokenType.GREATER_EQUAL: (">=", operator.ge),
+    TokenType.LESS: ("<", operator.lt),
+    TokenType.LESS_EQUAL: ("<=", operator.le),
+}
+COMPARISON = {TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS,
+              TokenType.LESS_EQUAL, TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL}
+
+
+class Unsupported(Exception):
+    """The loop uses something LoopCompiler doesn't handle."""
+
+
+# ================================ runtime support ================================
+# Generic versions of each operation, with the tree walker's checks and messages.
+
+def _numeric(function, op, a, b):
+    if type(a) is float and type(b) is float:
+        return function(a, b)
+    raise Interpreter.RuntimeError(f"{op} Operands must be a number.")
+
+
+def _divide(op, a, b):
+    if type(a) is not float or type(b) is not float:
+        raise Interpreter.RuntimeError(f"{op} Operands must be a number.")
+    if b == 0.0:
+        raise Interpreter.RuntimeError("Division by 0")
+    return a / b
+
+
+def _add(a, b):
+    if type(a) is float and type(b) is float:
+        return a + b
+    return concat(text(a), text(b))
+
+
+def _negate(a):
+    return -float(a)
+
+
+def _assign(values, key, value):
+    values[key] = value
+    return value
+
+
+def _refuel(interpreter):
+    interpreter.fuel = -1
+    interpreter.refuel()
+    return interpreter.fuel
+
+
+RUNTIME = {
+    "_numeric": _numeric,
+    "_divide": _divide,
+    "_add": _add,
+    "_negate": _negate,
+    "_assign": _assign,
+    "_refuel": _refuel,
+    "_truthy": runtime.is_truthy,
+    "_equal": runtime.is_equal,
+    "_stringify": runtime.stringify,
+    "_DEOPT": DEOPT,
+}
+
+
+# ================================ analysis ================================
+
+class LoopAnalysis(Expr.Visitor, Stmt.Visitor):
+    """Finds the variables a loop uses from outside it and what it assigns them.
+
+    Keys are ("local", depth, slot), with depth counted from the loop's own
+    environment, or ("global", name). Variables declared inside the loop
+    have no key.
+    """
+
+    def __init__(self):
+        self.keys: dict[Expr, tuple] = {}
+        self.assigned: dict[tuple, list[Expr]] = {}
+        self.has_calls = False
+        # blocks opened inside the loop around the node being visited
+        self.inner = 0
+
+    def run(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    def key(self, expr):
+        if expr.depth is None:
+            self.keys[expr] = ("global", expr.name.lexeme)
+        elif expr.depth >= self.inner:
+            self.keys[expr] = ("local", expr.depth - self.inner, expr.slot)
+
+    # ================================ Stmt.Visitor ================================
+    def visit_block_stmt(self, stmt: Block):
+        self.inner += 1
+        for s in stmt.statements:
+            s.accept(self)
+        self.inner -= 1
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt: Function):
+        # closures would need real Environments for the loop's blocks
+        raise Unsupported("fun")
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+    def visit_while_stmt(self, stmt: While):
+        self.run(stmt)
+
+    # ================================ Expr.Visitor ================================
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        self.key(expr)
+        if expr in self.keys:
+            self.assigned.setdefault(self.keys[expr], []).append(expr.value)
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: Call):
+        self.has_calls = True
+        expr.callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_var_expr(self, expr: Variable):
+        self.key(expr)
+
+
+# ================================ code generation ================================
+
+class LoopCompiler(Expr.Visitor, Stmt.Visitor):
+    """Emits a Python function that runs a While from its next iteration on.
+
+    The function takes the loop's Environment and works on the environments'
+    value lists and the globals dict in place, so the tree walker and the
+    compiled code can hand the loop back and forth between iterations.
+    Blocks inside the loop get a plain list instead of an Environment.
+
+    Outer variables that held floats when the loop got hot, and that the
+    loop only ever assigns floats, are `stable`: operations on them use
+    Python's operators directly, under a guard checked before each
+    iteration. A loop that makes calls gets no stable variables, since the
+    callee could assign any of them. It returns None when the loop ends, a
+    completion for `return`, or DEOPT when the guard fails.
+    """
+
+    def __init__(self, interpreter: Interpreter):
+        self.interpreter = interpreter
+        self.namespace: dict[str, Any] = dict(RUNTIME)
+        self.namespace["_g"] = interpreter._globals.values
+        self.namespace["_call"] = interpreter.call
+        self.namespace["_interpreter"] = interpreter
+        self.keys: dict[Expr, tuple] = {}
+        self.stable: set[tuple] = set()
+        self.blocks: list[Optional[str]] = []
+        self.outer: set[int] = set()
+        self.fueled = False
+        self.local_fuel = False
+        self.lines: list[str] = []
+        self.indent = 0
+        self.counter = 0
+
+    def compile(self, stmt: While, environment) -> Any:
+        analysis = LoopAnalysis()
+        try:
+            analysis.run(stmt)
+        except NotImplementedError:
+            raise Unsupported()
+        self.keys = analysis.keys
+        self.stable = self.stable_keys(analysis, environment)
+        # fuel only matters under a limit, and the JIT recompiles a loop
+        # when that changes. Without calls nothing else takes fuel while the
+        # loop runs, so it can be counted in a local and handed back after.
+        self.fueled = self.interpreter.limited
+        self.local_fuel = self.fueled and not analysis.has_calls
+
+        self.indent = 3 if self.local_fuel else 2
+        guards = [f"type({self.storage(key)}) is float" for key in sorted(self.stable)]
+        if guards:
+            self.emit(f"if not ({' and '.join(guards)}): return _DEOPT")
+        self.emit(f"if not {self.condition(stmt.condition)}: return None")
+        self.take_fuel()
+        self.statement(stmt.body)
+
+        header = ["def _loop(env):"]
+        for depth in sorted(self.outer):
+            header.append(f"    o{depth} = env{'.enclosing' * depth}.values")
+        footer = []
+        if self.local_fuel:
+            header.extend(["    _fuel = _interpreter.fuel", "    try:", "        while True:"])
+            footer.extend(["    finally:", "        _interpreter.fuel = _fuel"])
+        else:
+            header.append("    while True:")
+        source = "\n".join(header + self.lines + footer) + "\n"
+        exec(compile(source, "<lox loop>", "exec"), self.namespace)
+        return self.namespace["_loop"]
+
+    def stable_keys(self, analysis: LoopAnalysis, environment) -> set[tuple]:
+        globals_ = self.interpreter._globals.values
+        for key in set(analysis.keys.values()):
+            if key[0] == "global" and key[1] not in globals_:
+                # leave "Undefined variable" to the tree walker
+                raise Unsupported(key[1])
+        if analysis.has_calls:
+            return set()
+
+        stable = set()
+        for key in set(analysis.keys.values()):
+            if key[0] == "global":
+                value = globals_[key[1]]
+            else:
+                value = environment.ancestor(key[1]).values[key[2]]
+            if type(value) is float:
+                stable.add(key)
+        changed = True
+        while changed:
+            self.stable = stable
+            changed = False
+            for key in list(stable):
+                if any(self.type_of(value) is not float for value in analysis.assigned.get(key, ())):
+                    stable.discard(key)
+                    changed = True
+        return stable
+
+    # ================================ helpers ================================
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+    def take_fuel(self):
+        # a step per iteration, as Interpreter.visit_while_stmt takes
+        if not self.fueled:
+            return
+        if self.local_fuel:
+            self.emit("_fuel -= 1")
+            self.emit("if _fuel < 0: _fuel = _refuel(_interpreter)")
+        else:
+            self.emit("_interpreter.fuel -= 1")
+            self.emit("if _interpreter.fuel < 0: _interpreter.refuel()")
+
+    def constant(self, value: Any) -> str:
+        self.counter += 1
+        name = f"_k{self.counter}"
+        self.namespace[name] = value
+        return name
+
+    def temp(self) -> str:
+        self.counter += 1
+        return f"_t{self.counter}"
+
+    def expr(self, expr: Expr) -> str:
+        return expr.accept(self)
+
+    def statement(self, stmt: Stmt):
+        start = len(self.lines)
+        stmt.accept(self)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    def condition(self, expr: Expr) -> str:
+        # Python truthiness only disagrees with Lox on strings and nil
+        if self.type_of(expr) in (bool, float):
+            return self.expr(expr)
+        return f"_truthy({self.expr(expr)})"
+
+    def storage(self, key: tuple) -> str:
+        if key[0] == "global":
+            return f"_g[{key[1]!r}]"
+        self.outer.add(key[1])
+        return f"o{key[1]}[{key[2]}]"
+
+    def target(self, expr) -> tuple[str, Any]:
+        """The container and index for a variable, as Python source."""
+        key = self.keys.get(expr)
+        if key is None:
+            return self.blocks[len(self.blocks) - 1 - expr.depth], expr.slot
+        if key[0] == "global":
+            return "_g", repr(key[1])
+        self.outer.add(key[1])
+        return f"o{key[1]}", key[2]
+
+    def type_of(self, expr: Expr) -> Optional[type]:
+        """The Python type `expr` is guaranteed to have, given the guard."""
+        if isinstance(expr, Literal):
+            return type(expr.value)
+        if isinstance(expr, (Variable, Assign)):
+            return float if self.keys.get(expr) in self.stable else None
+        if isinstance(expr, Grouping):
+            return self.type_of(expr.expression)
+        if isinstance(expr, Unary):
+            return float if expr.op.type == TokenType.MINUS else bool
+        if isinstance(expr, Binary):
+            T = expr.op.type
+            if T in COMPARISON:
+                return bool
+            if T != TokenType.PLUS:
+                return float
+            left, right = self.type_of(expr.left), self.type_of(expr.right)
+            if left is float and right is float:
+                return float
+            if left is not None and right is not None:
+                return str
+        if isinstance(expr, Logical):
+            left = self.type_of(expr.left)
+            if left is not None and left == self.type_of(expr.right):
+                return left
+        return None
+
+    # ================================ Stmt.Visitor ================================
+    def visit_block_stmt(self, stmt: Block):
+        name = None
+        if any(isinstance(s, Var) for s in stmt.statements):
+            self.counter += 1
+            name = f"b{self.counter}"
+            self.emit(f"{name} = []")
+        self.blocks.append(name)
+        for s in stmt.statements:
+            s.accept(self)
+        self.blocks.pop()
+
+    def visit_expression_stmt(self, stmt: Expression):
+        expr = stmt.expression
+        if isinstance(expr, Assign):
+            values, index = self.target(expr)
+            self.emit(f"{values}[{index}] = {self.expr(expr.value)}")
+        else:
+            self.emit(self.expr(expr))
+
+    def visit_if_stmt(self, stmt: If):
+        self.emit(f"if {self.condition(stmt.condition)}:")
+        self.indent += 1
+        self.statement(stmt.then_branch)
+        self.indent -= 1
+        if stmt.else_branch is not None:
+            self.emit("else:")
+            self.indent += 1
+            self.statement(stmt.else_branch)
+            self.indent -= 1
+
+    def visit_print_stmt(self, stmt: Print):
+        self.emit(f"_interpreter.output.write(_stringify({self.expr(stmt.expression)}))")
+
+    def visit_return_stmt(self, stmt: Return):
+        value = stmt.value
+        if type(value) is Call and value.tail:
+            arguments = ", ".join(self.expr(a) for a in value.arguments)
+            self.emit(f"return _tail({self.expr(value.callee)}, [{arguments}])")
+            self.namespace["_tail"] = self.tail
+        elif value is None:
+            self.emit("return (None,)")
+        else:
+            self.emit(f"return ({self.expr(value)},)")
+
+    def tail(self, callee, arguments: list):
+        # Interpreter.visit_return_stmt, once callee and arguments are known
+        if type(callee) in TAIL_CALLABLE and len(arguments) == len(callee.declaration.params):
+            return TailCall(callee, arguments)
+        return (self.interpreter.call(callee, arguments),)
+
+    def visit_var_stmt(self, stmt: Var):
+        value = "None" if stmt.initializer is None else self.expr(stmt.initializer)
+        self.emit(f"{self.blocks[-1]}.append({value})")
+
+    def visit_while_stmt(self, stmt: While):
+        # types can't change mid-iteration, so the outer guard covers it
+        self.emit(f"while {self.condition(stmt.condition)}:")
+        self.indent += 1
+        self.take_fuel()
+        self.statement(stmt.body)
+        self.indent -= 1
+
+    # ================================ Expr.Visitor ================================
+    def visit_literal_expr(self, expr: Literal):
+        value = expr.value
+        if type(value) is float and not math.isfinite(value):
+            return self.constant(value)
+        return repr(value)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.expr(expr.expression)
+
+    def visit_var_expr(self, expr: Variable):
+        values, index = self.target(expr)
+        return f"{values}[{index}]"
+
+    def visit_assign_expr(self, expr: Assign):
+        values, index = self.target(expr)
+        return f"_assign({values}, {index}, {self.expr(expr.value)})"
+
+    def visit_unary_expr(self, expr: Unary):
+        right = self.expr(expr.right)
+        if expr.op.type == TokenType.MINUS:
+            if self.type_of(expr.right) is float:
+                return f"(-{right})"
+            return f"_negate({right})"
+        if self.type_of(expr.right) in (bool, float):
+            return f"(not {right})"
+        return f"(not _truthy({right}))"
+
+    def visit_binary_expr(self, expr: Binary):
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        T = expr.op.type
+        floats = self.type_of(expr.left) is float and self.type_of(expr.right) is float
+        if T == TokenType.PLUS:
+            if floats or self.type_of(expr.left) is str is self.type_of(expr.right):
+                return f"({left} + {right})"
+            return f"_add({left}, {right})"
+        if T == TokenType.EQUAL_EQUAL:
+            return f"({left} == {right})" if floats else f"_equal({left}, {right})"
+        if T == TokenType.BANG_EQUAL:
+            return f"({left} != {right})" if floats else f"(not _equal({left}, {right}))"
+        if T == TokenType.SLASH:
+            # LoopJit.run turns ZeroDivisionError into Lox's error
+            if floats:
+                return f"({left} / {right})"
+            return f"_divide({self.constant(expr.op)}, {left}, {right})"
+        symbol, function = NUMERIC[T]
+        if floats:
+            return f"({left} {symbol} {right})"
+        return f"_numeric({self.constant(function)}, {self.constant(expr.op)}, {left}, {right})"
+
+    def visit_logical_expr(self, expr: Logical):
+        left = self.expr(expr.left)
+        right = self.expr(expr.right)
+        is_or = expr.op.type == TokenType.OR
+        if self.type_of(expr.left) in (bool, float):
+            return f"({left} {'or' if is_or else 'and'} {right})"
+        temp = self.temp()
+        if is_or:
+            return f"({temp} if _truthy({temp} := {left}) else {right})"
+        return f"({right} if _truthy({temp} := {left}) else {temp})"
+
+    def visit_call_expr(self, expr: Call):
+        arguments = ", ".join(self.expr(a) for a in expr.arguments)
+        return f"_call({self.expr(expr.callee)}, [{arguments}])"
+
+
+# ================================ the JIT ================================
+
+class HotLoop:
+    __slots__ = ("iterations", "code", "deopts", "fueled")
+
+    def __init__(self):
+        self.iterations = 0
+        self.code = None
+        self.deopts = 0
+        # whether `code` takes fuel; see Interpreter.limit
+        self.fueled = False
+
+
+class LoopJit:
+    """Counts iterations of each While and compiles the hot ones.
+
+    Installed as `Interpreter.jit`. A loop is compiled once it has run
+    `threshold` iterations, counted across all its executions. When a guard
+    fails the loop goes back to counting, and after `max_deopts` failures
+    it stays interpreted.
+    """
+
+    def __init__(self, interpreter: Interpreter, threshold: int = 100, max_deopts: int = 3):
+        self.interpreter = interpreter
+        self.threshold = threshold
+        self.max_deopts = max_deopts
+        self.loops: dict[While, HotLoop] = {}
+        self.compiled = 0
+        self.unsupported = 0
+        self.deopts = 0
+
+    def run(self, stmt: While):
+        interpreter = self.interpreter
+        loop = self.loops.get(stmt)
+        if loop is None:
+            loop = self.loops[stmt] = HotLoop()
+        while True:
+            if loop.code is not None and loop.fueled is not interpreter.limited:
+                loop.code = self.compile(stmt)
+                loop.fueled = interpreter.limited
+            if loop.code is not None:
+                try:
+                    completion = loop.code(interpreter.environment)
+                except ZeroDivisionError:
+                    raise interpreter.RuntimeError("Division by 0")
+                if completion is not DEOPT:
+                    return completion
+                self.deoptimize(loop)
+
+            while interpreter.is_truthy(interpreter.evaluate(stmt.condition)):
+                interpreter.fuel -= 1
+                if interpreter.fuel < 0:
+                    interpreter.refuel()
+                completion = interpreter.execute(stmt.body)
+                if completion is not None:
+                    return completion
+                loop.iterations += 1
+                if loop.iterations == self.threshold:
+                    loop.code = self.compile(stmt)
+                    loop.fueled = interpreter.limited
+                    if loop.code is not None:
+                        break
+            else:
+                return None
+
+    def compile(self, stmt: While):
+        try:
+            code = LoopCompiler(self.interpreter).compile(stmt, self.interpreter.environment)
+        except Unsupported:
+            self.unsupported += 1
+            return None
+        self.compiled += 1
+        return code
+
+    def deoptimize(self, loop: HotLoop):
+        self.deopts += 1
+        loop.deopts += 1
+        loop.code = None
+        if loop.deopts < self.max_deopts:
+            loop.iterations = 0
+
+    def stats(self) -> str:
+        return f"{self.compiled} loops compiled, {self.unsupported} unsupported, {self.deopts} deopts"
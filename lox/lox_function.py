@@ -1,6 +1,19 @@
+import math
 from .lox_callable import LoxCallable
 from .stmt import Function
 from .environment import Environment
+from .memo import MemoCache, MISSING
+
+class TailCall:
+    """Completion of `return f(...)` when f is a LoxFunction: the caller's
+    `call` loop runs f next instead of nesting another call."""
+
+    __slots__ = ("function", "arguments")
+
+    def __init__(self, function: "LoxFunction", arguments: list):
+        self.function = function
+        self.arguments = arguments
+
 
 class LoxFunction(LoxCallable):
     def __init__(self, declaration: Function, closure: Environment):
@@ -9,17 +22,26 @@ class LoxFunction(LoxCallable):
 
     
     def call(self, interpreter, arguments: list):
-        environment = Environment(self.closure)
-        for i in range(len(self.declaration.params)):
-            environment.define(self.declaration.params[i].lexeme, arguments[i])
+        function = self
+        while True:
+            interpreter.fuel -= 1
+            if interpreter.fuel < 0:
+                interpreter.refuel()
+            # parameters take the first slots, in order
+            environment = interpreter.Environment(function.closure, list(arguments))
+
+            try:
+                completion = interpreter.execute_block(function.declaration.body, environment)
+            except interpreter.Return as e:
+                # subclasses may still unwind with the old exception
+                return e.value
 
-        print(vars(environment))
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except interpreter.Return as e:
-            return e.value
-        
-        return None
+            if completion is None:
+                return None
+            if type(completion) is not TailCall:
+                return completion[0]
+            function = completion.function
+            arguments = completion.arguments
 
 
     def arity(self):
@@ -27,3 +49,34 @@ class LoxFunction(LoxCallable):
     
     def __str__(self):
         return "<fn " + self.declaration.name.lexeme + ">"
+
+
+class MemoizedFunction(LoxFunction):
+    """A LoxFunction that PurityAnalysis found pure, so its results can be
+    reused for calls with the same number and string arguments."""
+
+    def __init__(self, declaration: Function, closure: Environment, memo: MemoCache):
+        super().__init__(declaration, closure)
+        self.memo = memo
+
+    def call(self, interpreter, arguments: list):
+        for argument in arguments:
+            # anything else may be mutable, or equal across types (1 == true)
+            if type(argument) is not float and type(argument) is not str:
+                return super().call(interpreter, arguments)
+        key = tuple(arguments)
+        if 0.0 in key:
+            # -0.0 == 0.0, but they print differently
+            key = tuple((argument, math.copysign(1.0, argument)) if type(argument) is float else argument
+                        for argument in key)
+        value = self.memo.get(key, MISSING)
+        if value is MISSING:
+            value = super().call(interpreter, arguments)
+            self.memo.put(key, value)
+        return value
+
+
+# Callees a `return f(...)` hands to the caller's loop as a TailCall. The
+# loop runs a MemoizedFunction's body without its memo; the memoized call
+# that started the loop stores the result it ends with.
+TAIL_CALLABLE = (LoxFunction, MemoizedFunction)
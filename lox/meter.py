@@ -0,0 +1,188 @@
+"""Approximate accounting of the memory a Lox run holds on to.
+
+MeteredInterpreter charges a Meter for what a script can grow without
+bound: Environment frames, and the strings and closures held in variables.
+A charge is released when the variable is overwritten or Python frees its
+frame, so the meter follows what the script holds, not everything it has
+ever allocated; building a string by appending in a loop is charged for
+the final string, not for every copy along the way. A value held by two
+variables counts twice, and one only passing through an expression is
+not counted at all.
+"""
+import gc
+import sys
+from typing import Any
+
+from .environment import Environment, GlobalEnvironment
+from .interpreter import Interpreter
+from .lox_function import LoxFunction
+from .rope import Rope
+from .session import Session
+from .token import Token
+
+# bytes for a frame and for each variable in it, besides what it holds
+FRAME = sys.getsizeof(Environment()) + sys.getsizeof([])
+SLOT = 8
+EMPTY = sys.getsizeof("")
+# a LoxFunction and its attribute dict; the frame it closes over is charged
+# for as long as it lives
+CLOSURE = sys.getsizeof(LoxFunction(None, None)) + sys.getsizeof(LoxFunction(None, None).__dict__)
+
+
+class Meter:
+    KINDS = ("strings", "frames", "closures")
+
+    def __init__(self, limit: int = None):
+        self.limit = limit
+        # live bytes by kind; the environments below add to these directly
+        self.strings = self.frames = self.closures = 0
+        self.peak = 0
+        self.peaks = dict.fromkeys(self.KINDS, 0)
+
+    @property
+    def live(self) -> int:
+        return self.strings + self.frames + self.closures
+
+    def charge(self, value: Any, sign: int = 1):
+        if type(value) is str:
+            self.strings += sign * sys.getsizeof(value)
+        elif type(value) is Rope:
+            # as the str it stands for, which it may yet become
+            self.strings += sign * (EMPTY + len(value))
+        elif isinstance(value, LoxFunction):
+            self.closures += sign * CLOSURE
+
+    def grew(self):
+        """Called after every charge that may have added to the total, once
+        the value is in place, so its release balances the books however
+        the run ends."""
+        live = self.strings + self.frames + self.closures
+        if live > self.peak:
+            self.peak = live
+            peaks = self.peaks
+            for kind in self.KINDS:
+                if getattr(self, kind) > peaks[kind]:
+                    peaks[kind] = getattr(self, kind)
+            if self.limit is not None and live > self.limit:
+                # a closure over its own frame is a cycle, released only
+                # when Python collects it
+                gc.collect()
+                if self.live > self.limit:
+                    raise MeteredInterpreter.MemoryLimitExceeded(f"Memory limit of {self.limit} bytes exceeded.")
+
+    def start(self, limit: int = None):
+        """Caps what is held from now on at `limit` bytes, and restarts the peaks."""
+        self.limit = limit
+        self.peak = self.live
+        self.peaks = {kind: getattr(self, kind) for kind in self.KINDS}
+
+    def summary(self) -> str:
+        kinds = ", ".join(f"{kind} {self.peaks[kind]}" for kind in self.KINDS)
+        return f"peak {self.peak} bytes held ({kinds}, each at its own peak), {self.live} still held"
+
+
+class MeteredEnvironment(Environment):
+    __slots__ = ("meter",)
+
+    def __init__(self, enclosing: Environment = None, values: list = None):
+        self.values = values = [] if values is None else values
+        self.enclosing = enclosing
+        # frames only ever enclose metered frames, down to MeteredGlobals
+        meter = self.meter = enclosing.meter
+        meter.frames += FRAME + SLOT * len(values)
+        for value in values:
+            if type(value) is not float:
+                meter.charge(value)
+        # Meter.grew, only when it has anything to do
+        if meter.strings + meter.frames + meter.closures > meter.peak:
+            meter.grew()
+
+    def __del__(self):
+        meter = self.meter
+        meter.frames -= FRAME + SLOT * len(self.values)
+        for value in self.values:
+            if type(value) is not float:
+                meter.charge(value, -1)
+
+    def define(self, name: str, value: Any):
+        self.values.append(value)
+        meter = self.meter
+        meter.frames += SLOT
+        if type(value) is not float:
+            meter.charge(value)
+        if meter.strings + meter.frames + meter.closures > meter.peak:
+            meter.grew()
+
+    def assign_at(self, distance: int, slot: int, value: Any):
+        env = self
+        while distance:
+            env = env.enclosing
+            distance -= 1
+        values = env.values
+        previous = values[slot]
+        values[slot] = value
+        if type(value) is not float or type(previous) is not float:
+            meter = self.meter
+            meter.charge(previous, -1)
+            meter.charge(value)
+            meter.grew()
+
+
+class MeteredGlobals(GlobalEnvironment):
+    __slots__ = ("meter",)
+
+    def __init__(self, meter: Meter):
+        super().__init__()
+        self.meter = meter
+
+    def define(self, name: str, value: Any):
+        if name in self.values:
+            self.meter.charge(self.values[name], -1)
+        else:
+            self.meter.frames += SLOT
+        self.values[name] = value
+        self.meter.charge(value)
+        self.meter.grew()
+
+    def assign(self, name: Token, value: Any):
+        previous = self.get(name)
+        self.values[name.lexeme] = value
+        if type(value) is not float or type(previous) is not float:
+            self.meter.charge(previous, -1)
+            self.meter.charge(value)
+            self.meter.grew()
+
+    def replace(self, values: dict):
+        for value in self.values.values():
+            self.meter.charge(value, -1)
+        self.meter.frames += SLOT * (len(values) - len(self.values))
+        super().replace(values)
+        for value in values.values():
+            self.meter.charge(value)
+        self.meter.grew()
+
+
+class MeteredInterpreter(Interpreter):
+    """The tree walker, charging a Meter as it goes; `max_memory` caps it."""
+
+    class MemoryLimitExceeded(Interpreter.BudgetExceeded):
+        pass
+
+    Environment = MeteredEnvironment
+
+    def __init__(self, max_memory: int = None):
+        super().__init__()
+        self.meter = Meter(max_memory)
+        metered = MeteredGlobals(self.meter)
+        metered.replace(self._globals.values)
+        self._globals = self.environment = metered
+
+
+class MeteredSession(Session):
+    """A Session whose runs can each be capped at a number of bytes held."""
+
+    engine = MeteredInterpreter
+
+    def run(self, source: str, steps: int = None, seconds: float = None, memory: int = None) -> Any:
+        self.interpreter.meter.start(memory)
+        return super().run(source, steps, seconds)
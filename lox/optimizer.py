@@ -0,0 +1,331 @@
+from typing import Optional
+
+from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
+from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
+from .token_type import TokenType
+from .interpreter import Interpreter
+from .runtime import is_truthy
+from .rope import flatten
+
+
+class Pass(Expr.Visitor, Stmt.Visitor):
+    """A rewrite of a resolved tree.
+
+    Visit methods return the node that replaces the one visited, usually the
+    same node with its children rewritten in place. A statement in a list may
+    return None to be dropped. `resolved` maps each Variable/Assign to the
+    (depth, slot) the Resolver gave it.
+    """
+
+    def __init__(self, resolved: dict):
+        self.resolved = resolved
+
+    def run(self, statements: list[Stmt]) -> list[Stmt]:
+        return self.statements(statements)
+
+    def statements(self, statements: list[Stmt]) -> list[Stmt]:
+        result = []
+        for stmt in statements:
+            stmt = stmt.accept(self)
+            if stmt is not None:
+                result.append(stmt)
+        return result
+
+    def statement(self, stmt: Stmt) -> Stmt:
+        # for places that need exactly one statement, like a loop body
+        stmt = stmt.accept(self)
+        return Block([]) if stmt is None else stmt
+
+    def expr(self, expr: Optional[Expr]) -> Optional[Expr]:
+        return None if expr is None else expr.accept(self)
+
+    # ================================ Stmt.Visitor ================================
+    def visit_block_stmt(self, stmt: Block):
+        stmt.statements = self.statements(stmt.statements)
+        return stmt
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression = self.expr(stmt.expression)
+        return stmt
+
+    def visit_function_stmt(self, stmt: Function):
+        stmt.body = self.statements(stmt.body)
+        return stmt
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition = self.expr(stmt.condition)
+        stmt.then_branch = self.statement(stmt.then_branch)
+        if stmt.else_branch is not None:
+            stmt.else_branch = self.statement(stmt.else_branch)
+        return stmt
+
+    def visit_print_stmt(self, stmt: Print):
+        stmt.expression = self.expr(stmt.expression)
+        return stmt
+
+    def visit_return_stmt(self, stmt: Return):
+        stmt.value = self.expr(stmt.value)
+        return stmt
+
+    def visit_var_stmt(self, stmt: Var):
+        stmt.initializer = self.expr(stmt.initializer)
+        return stmt
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition = self.expr(stmt.condition)
+        stmt.body = self.statement(stmt.body)
+        return stmt
+
+    # ================================ Expr.Visitor ================================
+    def visit_assign_expr(self, expr: Assign):
+        expr.value = self.expr(expr.value)
+        return expr
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left = self.expr(expr.left)
+        expr.right = self.expr(expr.right)
+        return expr
+
+    def visit_call_expr(self, expr: Call):
+        expr.callee = self.expr(expr.callee)
+        expr.arguments = [self.expr(a) for a in expr.arguments]
+        return expr
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression = self.expr(expr.expression)
+        return expr
+
+    def visit_literal_expr(self, expr: Literal):
+        return expr
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left = self.expr(expr.left)
+        expr.right = self.expr(expr.right)
+        return expr
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right = self.expr(expr.right)
+        return expr
+
+    def visit_var_expr(self, expr: Variable):
+        return expr
+
+
+class ScopedPass(Pass):
+    """A Pass that tracks local scopes the way the Resolver builds them.
+
+    Each scope is a list indexed by slot holding the declaring Var, or None
+    for parameters and functions, so `binding()` can map a resolved
+    Variable/Assign back to its declaration.
+    """
+
+    def __init__(self, resolved: dict):
+        super().__init__(resolved)
+        self.scopes: list[list] = []
+
+    def binding(self, expr: Expr) -> Optional[Var]:
+        resolution = self.resolved.get(expr)
+        if resolution is None:
+            return None
+        depth, slot = resolution
+        return self.scopes[len(self.scopes) - 1 - depth][slot]
+
+    def declare(self, declaration: Optional[Var]):
+        if self.scopes:
+            self.scopes[-1].append(declaration)
+
+    def visit_block_stmt(self, stmt: Block):
+        self.scopes.append([])
+        stmt.statements = self.statements(stmt.statements)
+        self.scopes.pop()
+        return stmt
+
+    def visit_function_stmt(self, stmt: Function):
+        self.declare(None)
+        self.scopes.append([None] * len(stmt.params))
+        stmt.body = self.statements(stmt.body)
+        self.scopes.pop()
+        return stmt
+
+    def visit_var_stmt(self, stmt: Var):
+        self.declare(stmt)
+        stmt.initializer = self.expr(stmt.initializer)
+        return stmt
+
+
+class ConstantFolder(Pass):
+    """Evaluates Unary, Binary and Logical nodes whose operands are literals.
+
+    Folding uses the tree walker itself, so folded values have exactly the
+    runtime's semantics. Anything that would raise is left for runtime to
+    report. Groupings are dropped; the tree already encodes precedence.
+    """
+
+    def __init__(self, resolved: dict):
+        super().__init__(resolved)
+        self.evaluator = Interpreter()
+
+    def fold(self, expr: Expr) -> Expr:
+        try:
+            # a long string comes back as a Rope, which only the tree walker knows
+            return Literal(flatten(self.evaluator.evaluate(expr)))
+        except Exception:
+            return expr
+
+    def visit_grouping_expr(self, expr: Grouping):
+        return self.expr(expr.expression)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right = self.expr(expr.right)
+        if isinstance(expr.right, Literal):
+            return self.fold(expr)
+        return expr
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left = self.expr(expr.left)
+        expr.right = self.expr(expr.right)
+        if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+            return self.fold(expr)
+        return expr
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left = self.expr(expr.left)
+        expr.right = self.expr(expr.right)
+        if not isinstance(expr.left, Literal):
+            return expr
+        if is_truthy(expr.left.value) == (expr.op.type == TokenType.OR):
+            return expr.left
+        return expr.right
+
+
+class AssignmentFinder(ScopedPass):
+    """Collects the local Vars that are the target of some Assign."""
+
+    def __init__(self, resolved: dict):
+        super().__init__(resolved)
+        self.assigned: set = set()
+
+    def visit_assign_expr(self, expr: Assign):
+        expr.value = self.expr(expr.value)
+        self.assigned.add(self.binding(expr))
+        return expr
+
+
+class ConstantPropagator(ScopedPass, ConstantFolder):
+    """Replaces reads of never-assigned locals with their literal value.
+
+    Folds as it goes, so `var a = 2; var b = a * 3;` propagates both. Globals
+    are left alone: any function may redeclare or assign them by name. The
+    Var declarations stay, since later locals are addressed by slot.
+    """
+
+    def __init__(self, resolved: dict):
+        super().__init__(resolved)
+        self.constants: dict = {}
+
+    def run(self, statements: list[Stmt]) -> list[Stmt]:
+        finder = AssignmentFinder(self.resolved)
+        finder.run(statements)
+        self.assigned = finder.assigned
+        return super().run(statements)
+
+    def visit_var_stmt(self, stmt: Var):
+        super().visit_var_stmt(stmt)
+        if not self.scopes or stmt in self.assigned:
+            return stmt
+        if stmt.initializer is None:
+            self.constants[stmt] = None
+        elif isinstance(stmt.initializer, Literal):
+            self.constants[stmt] = stmt.initializer.value
+        return stmt
+
+    def visit_var_expr(self, expr: Variable):
+        declaration = self.binding(expr)
+        if declaration in self.constants:
+            return Literal(self.constants[declaration])
+        return expr
+
+
+class DeadCodeEliminator(Pass):
+    """Drops If branches that a literal condition rules out, and statements
+    that follow a `return` in the same block."""
+
+    def run(self, statements: list[Stmt]) -> list[Stmt]:
+        result = []
+        for stmt in statements:
+            replacement = stmt.accept(self)
+            # `interpret` hands back the value of a trailing expression
+            # statement, so at top level an If may neither vanish nor turn
+            # into one
+            if replacement is None or (isinstance(stmt, If) and isinstance(replacement, Expression)):
+                replacement = stmt
+            result.append(replacement)
+        return result
+
+    def statements(self, statements: list[Stmt]) -> list[Stmt]:
+        result = []
+        for stmt in statements:
+            stmt = stmt.accept(self)
+            if stmt is None:
+                continue
+            result.append(stmt)
+            if isinstance(stmt, Return):
+                break
+        return result
+
+    def visit_if_stmt(self, stmt: If):
+        super().visit_if_stmt(stmt)
+        if not isinstance(stmt.condition, Literal):
+            return stmt
+        if is_truthy(stmt.condition.value):
+            return stmt.then_branch
+        return stmt.else_branch
+
+
+class ResolvedExprs(Pass):
+    """Collects every Variable and Assign still in the tree."""
+
+    def __init__(self):
+        super().__init__({})
+        self.found: set = set()
+
+    def visit_var_expr(self, expr: Variable):
+        self.found.add(expr)
+        return expr
+
+    def visit_assign_expr(self, expr: Assign):
+        self.found.add(expr)
+        return super().visit_assign_expr(expr)
+
+
+class Optimizer:
+    """Runs the passes for an optimization level over a resolved program.
+
+    Expressions a pass removes are also dropped from the engine's `_locals`
+    table and from `resolutions`, so neither refers to nodes that are gone.
+    """
+
+    PIPELINES = {
+        0: [],
+        1: [ConstantFolder, DeadCodeEliminator],
+        2: [ConstantPropagator, DeadCodeEliminator],
+    }
+
+    def __init__(self, engine, level: int = 1):
+        self.engine = engine
+        self.passes = self.PIPELINES[level]
+
+    def optimize(self, statements: list[Stmt], resolutions: list) -> list[Stmt]:
+        if not self.passes:
+            return statements
+        resolved = {expr: (depth, slot) for expr, depth, slot in resolutions}
+        for optimization in self.passes:
+            statements = optimization(resolved).run(statements)
+
+        live = ResolvedExprs()
+        live.run(statements)
+        for expr in resolved:
+            if expr not in live.found:
+                self.engine._locals.pop(expr, None)
+        resolutions[:] = [r for r in resolutions if r[0] in live.found]
+        return statements
@@ -0,0 +1,69 @@
+"""Where `print` goes.
+
+Every engine hands each printed line to its `output`, which gathers them
+and passes them on in one piece once `threshold` characters have built up
+and when the run ends, rather than writing once per line.
+
+    engine.output = ListOutput()                  # keep the lines in .lines
+    engine.output = CallbackOutput(send)          # send(text) per batch
+    engine.output = StreamOutput(file, 1 << 16)   # the default is sys.stdout
+"""
+import sys
+from typing import Callable, TextIO
+
+
+class Output:
+    def __init__(self, threshold: int = 8192):
+        self.threshold = threshold
+        self.buffer: list[str] = []
+        self.size = 0
+
+    def write(self, line: str):
+        self.buffer.append(line)
+        self.size += len(line) + 1
+        if self.size >= self.threshold:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            text = "\n".join(self.buffer) + "\n"
+            self.buffer = []
+            self.size = 0
+            self.emit(text)
+
+    def emit(self, text: str):
+        raise NotImplementedError()
+
+
+class StreamOutput(Output):
+    """Writes to `stream`, or to whatever sys.stdout is at the time, so
+    redirect_stdout() still captures a run."""
+
+    def __init__(self, stream: TextIO = None, threshold: int = 8192):
+        super().__init__(threshold)
+        self.stream = stream
+
+    def emit(self, text: str):
+        (self.stream or sys.stdout).write(text)
+
+
+class CallbackOutput(Output):
+    def __init__(self, callback: Callable[[str], None], threshold: int = 8192):
+        super().__init__(threshold)
+        self.callback = callback
+
+    def emit(self, text: str):
+        self.callback(text)
+
+
+class ListOutput(Output):
+    """Keeps every printed line, without its newline, in `lines`."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines: list[str] = []
+        # nothing to batch for
+        self.write = self.lines.append
+
+    def text(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
@@ -1,3 +1,5 @@
+from typing import Iterable, Iterator
+
 from .token import Token
 from .token_type import TokenType
 from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
@@ -9,15 +11,23 @@ class Parser:
     class ParserError(Exception):
         pass
 
-    def __init__(self, tokens: list[Token]):
-        self.tokens: list[Token] = tokens
-        self.current = 0
+    def __init__(self, tokens: Iterable[Token], report=error_report):
+        # called with (token, message) for each syntax error
+        self.report = report
+        # one token of lookahead, so `tokens` can be a lazy stream
+        self.tokens: Iterator[Token] = iter(tokens)
+        self.previous_token: Token = None
+        self.next_token: Token = next(self.tokens)
+        # literal values shared by every Literal node with the same constant
+        self.constants: dict = {}
 
     def parse(self) -> list[Stmt]:
-        statements = []
+        return list(self.iter_parse())
+
+    def iter_parse(self) -> Iterator[Stmt]:
+        """Yields each top-level declaration as soon as it is parsed."""
         while not self.is_at_end():
-            statements.append(self.declaration())
-        return statements
+            yield self.declaration()
     
     def declaration(self) -> Stmt:
         try:
@@ -28,8 +38,8 @@ class Parser:
             else:
                 return self.statement()
         except self.ParserError:
-            #synchronize()
-            pass
+            # skip to the next statement, or the same error repeats forever
+            self.synchronize()
             return None
 
     def var_declaration(self):
@@ -293,7 +303,7 @@ class Parser:
             return Literal(None)
 
         if self.match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self.previous().literal)
+            return Literal(self.constant(self.previous().literal))
 
         if self.match(TokenType.IDENTIFIER):
             return Variable(self.previous())
@@ -303,8 +313,11 @@ class Parser:
             self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return Grouping(expr)
 
-        raise self.ParserError(f"{self.peek()}, Expect expression")
+        raise self.error(self.peek(), "Expect expression.")
+
 
+    def constant(self, value):
+        return self.constants.setdefault((type(value), value), value)
 
     def consume(self, t: TokenType, message: str):
         if self.check(t):
@@ -312,8 +325,18 @@ class Parser:
         else:
             raise self.error(self.peek(), message)
     
+    def synchronize(self):
+        self.advance()
+        while not self.is_at_end():
+            if self.previous().type == TokenType.SEMICOLON:
+                return
+            if self.peek().type in (TokenType.CLASS, TokenType.FUN, TokenType.VAR, TokenType.FOR,
+                                    TokenType.IF, TokenType.WHILE, TokenType.PRINT, TokenType.RETURN):
+                return
+            self.advance()
+
     def error(self, token: Token, message: str):
-        error_report(token, message)
+        self.report(token, message)
         return self.ParserError("Could not parse")
     
     def match(self, * types: TokenType):
@@ -331,15 +354,16 @@ class Parser:
 
     def advance(self) -> Token:
         if not self.is_at_end():
-            self.current += 1
-        return self.previous()
+            self.previous_token = self.next_token
+            self.next_token = next(self.tokens)
+        return self.previous_token
 
     def is_at_end(self) -> bool:
         return self.peek().type == TokenType.EOF
     
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.next_token
     
     def previous(self) -> Token:
-        return self.tokens[self.current-1]
+        return self.previous_token
     
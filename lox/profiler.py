@@ -0,0 +1,168 @@
+import time
+from collections import Counter
+from typing import Any, Optional
+
+from .expr import Expr
+from .stmt import Stmt, Expression, Return
+from .token import Token
+from .environment import Environment
+from .interpreter import Interpreter
+from .lox_callable import LoxCallable
+from .lox_function import LoxFunction, TailCall
+
+SCRIPT = "<script>"
+
+
+def line_of(node) -> Optional[int]:
+    """Line of the first token in a statement or expression, if it has one."""
+    for name in type(node).__slots__:
+        value = getattr(node, name, None)
+        if isinstance(value, Token):
+            return value.line
+        if isinstance(value, Expr):
+            line = line_of(value)
+            if line is not None:
+                return line
+    return None
+
+
+class FunctionStats:
+    __slots__ = ("name", "line", "calls", "active", "inclusive", "exclusive")
+
+    def __init__(self, name: str, line: Optional[int]):
+        self.name = name
+        self.line = line
+        self.calls = 0
+        # calls currently on the stack, so recursion isn't counted twice
+        self.active = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+
+class Profile:
+    """What a ProfilingInterpreter measured: per-function call counts and
+    wall times, per-line statement hits, and exclusive time per call stack."""
+
+    def __init__(self):
+        self.functions: dict[Any, FunctionStats] = {}
+        self.lines: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self._statement_lines: dict[Stmt, Optional[int]] = {}
+
+    def function(self, key, name: str, line: Optional[int]) -> FunctionStats:
+        stats = self.functions.get(key)
+        if stats is None:
+            stats = self.functions[key] = FunctionStats(name, line)
+        return stats
+
+    def hit(self, stmt: Stmt):
+        line = self._statement_lines.get(stmt, -1)
+        if line == -1:
+            line = self._statement_lines[stmt] = line_of(stmt)
+        if line is not None:
+            self.lines[line] += 1
+
+    def report(self, top: int = 20) -> str:
+        out = [f"{'calls':>8} {'incl ms':>10} {'excl ms':>10}  function"]
+        for stats in sorted(self.functions.values(), key=lambda s: s.exclusive, reverse=True):
+            where = f" (line {stats.line})" if stats.line is not None else ""
+            out.append(f"{stats.calls:>8} {stats.inclusive * 1000:>10.2f} "
+                       f"{stats.exclusive * 1000:>10.2f}  {stats.name}{where}")
+        out.append("")
+        out.append(f"{'hits':>8}  line")
+        for line, hits in self.lines.most_common(top):
+            out.append(f"{hits:>8}  {line}")
+        return "\n".join(out)
+
+    def write_collapsed(self, path: str):
+        # one "outer;inner <microseconds>" line per distinct stack, the input
+        # format of flamegraph.pl, speedscope and friends
+        with open(path, "w") as file:
+            for stack, seconds in sorted(self.stacks.items()):
+                micros = round(seconds * 1e6)
+                if micros:
+                    file.write(f"{';'.join(stack)} {micros}\n")
+
+
+class ProfilingInterpreter(Interpreter):
+    """Tree walker that fills in a Profile as it runs.
+
+    All hooks are overrides, so the plain Interpreter carries none of this.
+    A tail call ends the caller's frame and starts the callee's in its
+    place, as the call itself does, so deep tail recursion still runs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.profile = Profile()
+        # [stats, names so far, start, time spent in callees]
+        self.frames: list[list] = []
+
+    def interpret(self, statements: list[Stmt]):
+        for stmt in statements:
+            # interpret() evaluates these directly rather than via execute()
+            if isinstance(stmt, Expression):
+                self.profile.hit(stmt)
+        root = self.profile.function(SCRIPT, SCRIPT, None)
+        self.enter(root, (SCRIPT,))
+        try:
+            return super().interpret(statements)
+        finally:
+            self.leave()
+
+    def enter(self, stats: FunctionStats, stack: tuple):
+        stats.calls += 1
+        stats.active += 1
+        self.frames.append([stats, stack, time.perf_counter(), 0.0])
+
+    def leave(self):
+        stats, stack, start, children = self.frames.pop()
+        elapsed = time.perf_counter() - start
+        exclusive = elapsed - children
+        stats.exclusive += exclusive
+        self.profile.stacks[stack] += exclusive
+        stats.active -= 1
+        if not stats.active:
+            stats.inclusive += elapsed
+        if self.frames:
+            self.frames[-1][3] += elapsed
+
+    def call(self, callee: Any, arguments: list):
+        if not isinstance(callee, LoxCallable):
+            return super().call(callee, arguments)
+        self.enter_call(callee)
+        try:
+            return super().call(callee, arguments)
+        finally:
+            self.leave()
+
+    def enter_call(self, callee: LoxCallable):
+        if isinstance(callee, LoxFunction):
+            declaration = callee.declaration
+            stats = self.profile.function(declaration, declaration.name.lexeme, declaration.name.line)
+        else:
+            stats = self.profile.function(type(callee), str(callee), None)
+        self.enter(stats, self.frames[-1][1] + (stats.name,))
+
+    def execute(self, stmt: Stmt):
+        self.profile.hit(stmt)
+        return stmt.accept(self)
+
+    def execute_block(self, statements: list[Stmt], environment: Environment):
+        previous = self.environment
+        self.environment = environment
+        try:
+            for statement in statements:
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
+        finally:
+            self.environment = previous
+
+    def visit_return_stmt(self, stmt: Return):
+        completion = super().visit_return_stmt(stmt)
+        if type(completion) is TailCall:
+            # call()'s leave() closes the callee's frame once the loop ends
+            self.leave()
+            self.enter_call(completion.function)
+        return completion
@@ -0,0 +1,161 @@
+from collections import Counter
+
+from .expr import Expr, Binary, Unary, Literal, Grouping, Variable, Assign, Logical, Call
+from .stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return
+
+
+class _Facts:
+    __slots__ = ("impure", "globals_read")
+
+    def __init__(self):
+        self.impure = False
+        self.globals_read: set[str] = set()
+
+
+class PurityAnalysis(Expr.Visitor, Stmt.Visitor):
+    """Finds top-level functions whose result depends only on their arguments.
+
+    A function qualifies when its body never prints, never assigns or reads
+    a variable outside its own scopes, declares no closures, and only reads
+    globals that are themselves qualifying functions, so anything impure
+    reached through a call, like `clock`, disqualifies it. The function's
+    own name must be declared once with `fun` and never assigned.
+
+    `locals_` is the tree walker's resolution table, expr -> (depth, slot).
+    """
+
+    def __init__(self, locals_: dict):
+        self._locals = locals_
+        self.facts: _Facts = None
+        # scopes opened inside the function being analysed
+        self.depth = 0
+        self.assigned_globals: set[str] = set()
+
+    def pure_functions(self, statements: list[Stmt]) -> set[Function]:
+        declared = Counter()
+        functions: dict[str, Function] = {}
+        for stmt in statements:
+            if isinstance(stmt, Function):
+                declared[stmt.name.lexeme] += 1
+                functions[stmt.name.lexeme] = stmt
+            elif isinstance(stmt, Var):
+                self.assigned_globals.add(stmt.name.lexeme)
+
+        facts: dict[str, _Facts] = {}
+        for stmt in statements:
+            if isinstance(stmt, Function):
+                self.facts = _Facts()
+                self.depth = 1
+                self.statements(stmt.body)
+                facts[stmt.name.lexeme] = self.facts
+                self.facts = None
+            else:
+                stmt.accept(self)
+
+        pure = {name for name in functions
+                if declared[name] == 1 and name not in self.assigned_globals
+                and not facts[name].impure}
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pure):
+                if not facts[name].globals_read <= pure:
+                    pure.discard(name)
+                    changed = True
+        return {functions[name] for name in pure}
+
+    def statements(self, statements: list[Stmt]):
+        for stmt in statements:
+            stmt.accept(self)
+
+    def impure(self):
+        if self.facts is not None:
+            self.facts.impure = True
+
+    def is_outer(self, expr: Expr) -> bool:
+        # True when expr resolves outside the function being analysed
+        resolution = self._locals.get(expr)
+        return resolution is None or resolution[0] >= self.depth
+
+    # ================================ Stmt.Visitor ================================
+    def visit_block_stmt(self, stmt: Block):
+        self.depth += 1
+        self.statements(stmt.statements)
+        self.depth -= 1
+
+    def visit_expression_stmt(self, stmt: Expression):
+        stmt.expression.accept(self)
+
+    def visit_function_stmt(self, stmt: Function):
+        # creating closures makes the result depend on more than arguments;
+        # the body is still walked for assignments to globals
+        self.impure()
+        facts = self.facts
+        self.facts = None
+        self.statements(stmt.body)
+        self.facts = facts
+
+    def visit_if_stmt(self, stmt: If):
+        stmt.condition.accept(self)
+        stmt.then_branch.accept(self)
+        if stmt.else_branch is not None:
+            stmt.else_branch.accept(self)
+
+    def visit_print_stmt(self, stmt: Print):
+        self.impure()
+        stmt.expression.accept(self)
+
+    def visit_return_stmt(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value.accept(self)
+
+    def visit_var_stmt(self, stmt: Var):
+        if stmt.initializer is not None:
+            stmt.initializer.accept(self)
+
+    def visit_while_stmt(self, stmt: While):
+        stmt.condition.accept(self)
+        stmt.body.accept(self)
+
+    # ================================ Expr.Visitor ================================
+    def visit_assign_expr(self, expr: Assign):
+        expr.value.accept(self)
+        if self._locals.get(expr) is None:
+            self.assigned_globals.add(expr.name.lexeme)
+        if self.is_outer(expr):
+            self.impure()
+
+    def visit_binary_expr(self, expr: Binary):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_call_expr(self, expr: Call):
+        # only calls to named globals can be checked; a parameter or a
+        # computed callee could be anything
+        callee = expr.callee
+        if not isinstance(callee, Variable) or self._locals.get(callee) is not None:
+            self.impure()
+        callee.accept(self)
+        for argument in expr.arguments:
+            argument.accept(self)
+
+    def visit_grouping_expr(self, expr: Grouping):
+        expr.expression.accept(self)
+
+    def visit_literal_expr(self, expr: Literal):
+        pass
+
+    def visit_logical_expr(self, expr: Logical):
+        expr.left.accept(self)
+        expr.right.accept(self)
+
+    def visit_unary_expr(self, expr: Unary):
+        expr.right.accept(self)
+
+    def visit_var_expr(self, expr: Variable):
+        if self.facts is None:
+            return
+        if self._locals.get(expr) is None:
+            self.facts.globals_read.add(expr.name.lexeme)
+        elif self.is_outer(expr):
+            self.facts.impure = True
@@ -9,6 +9,8 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
     def __init__(self, interpreter):
         self.interpreter = interpreter
         self.scopes = []
+        # parallel to scopes: name -> slot in the runtime Environment
+        self.slots = []
         self.current_function: FunctionType = FunctionType.NONE
     
     def resolve_stmt_list(self, statements: list[Stmt]):
@@ -24,7 +26,7 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
 
     def resolve(self, ob):
         # if isinstance(ob, list[Stmt]):
-        if isinstance(ob, list) and isinstance(ob[0], Stmt):
+        if isinstance(ob, list):
             self.resolve_stmt_list(ob)
         if isinstance(ob, Stmt):
             self.resolve_stmt(ob)
@@ -33,9 +35,11 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
 
     def begin_scope(self):
         self.scopes.append({})
+        self.slots.append({})
     
     def end_scope(self):
         self.scopes.pop()
+        self.slots.pop()
     
     
     def visit_block_stmt(self, stmt: Block):
@@ -53,7 +57,7 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
     
     def visit_var_expr(self, expr: Variable):
          
-        if len(self.scopes) and self.scopes[-1][expr.name.lexeme] == False:
+        if len(self.scopes) and self.scopes[-1].get(expr.name.lexeme) == False:
             raise Exception(f"{expr.name} Can't read local variable in its own initializer.")
 
         self.resolve_local(expr, expr.name)
@@ -91,6 +95,8 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
             raise Exception("Can't return from top-level code.")
         if stmt.value:
             self.resolve(stmt.value)
+            if isinstance(stmt.value, Call):
+                stmt.value.tail = True
         return None
     
     def visit_while_stmt(self, stmt: While):
@@ -133,7 +139,7 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
         i = len(self.scopes) - 1
         while i >= 0:
             if name.lexeme in self.scopes[i]:
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+                self.interpreter.resolve(expr, len(self.scopes) - 1 - i, self.slots[i][name.lexeme])
                 return
             i -= 1
 
@@ -149,7 +155,7 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
 
         self.resolve_stmt_list(function.body)
         self.end_scope()
-        self.currentFunction = enclosing_function
+        self.current_function = enclosing_function
 
     def declare(self, name: Token):
         if not self.scopes: 
@@ -160,6 +166,8 @@ class Resolver(Expr.Visitor, Stmt.Visitor):
             raise Exception(f"Already a variable with this name '{name.lexeme}' in this scope.")
 
         scope[name.lexeme] = False
+        # locals are appended to their Environment in declaration order
+        self.slots[-1][name.lexeme] = len(self.slots[-1])
 
     def define(self, name: Token):
         if not self.scopes: 
@@ -0,0 +1,73 @@
+"""Strings built up by `+`.
+
+Python copies both operands for every `+`, so a script that appends to a
+string in a loop does quadratic work. Past ROPE_MIN characters the tree
+walker makes a Rope of the two halves instead, and joins the pieces only
+when the text is needed: printing, comparing equal-length strings, or
+handing it to Python. A Rope is only ever a Lox string; stringify,
+is_equal and is_truthy treat it exactly like the str it stands for.
+"""
+from typing import Any, Union
+
+# below this many characters copying is cheaper than a Rope
+ROPE_MIN = 1024
+
+
+class Rope:
+    __slots__ = ("left", "right", "length")
+
+    def __init__(self, left: Union[str, "Rope"], right: Union[str, "Rope"], length: int):
+        self.left = left
+        self.right = right
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        if self.right is not None:
+            # a script appending in a loop builds a chain as long as the
+            # loop, so walk it without recursing
+            parts = []
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                if type(node) is str:
+                    parts.append(node)
+                elif node.right is None:
+                    parts.append(node.left)
+                else:
+                    stack.append(node.right)
+                    stack.append(node.left)
+            # keep the text and let go of the pieces
+            self.left = "".join(parts)
+            self.right = None
+        return self.left
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is str or type(other) is Rope:
+            return len(other) == self.length and str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __repr__(self) -> str:
+        return f"Rope({str(self)!r})"
+
+
+def concat(left: Union[str, Rope], right: Union[str, Rope]) -> Union[str, Rope]:
+    length = len(left) + len(right)
+    if length < ROPE_MIN:
+        # a Rope is never this short, so both are str
+        return left + right
+    return Rope(left, right, length)
+
+
+def text(value: Any) -> Union[str, Rope]:
+    """`value` as the operand of a string `+`."""
+    return value if type(value) is str or type(value) is Rope else str(value)
+
+
+def flatten(value: Any) -> Any:
+    return str(value) if type(value) is Rope else value
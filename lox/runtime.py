@@ -0,0 +1,34 @@
+from typing import Any
+
+# Value semantics shared by every engine. The tree walker exposes these as
+# methods; the other engines import them directly so they stay in lockstep.
+
+def is_truthy(ob: Any) -> bool:
+    # TODO: check this is true in pythonx
+    if ob is None:
+        return False
+    if ob == 0.0 or ob == 0:
+        return False
+    if isinstance(ob, bool):
+        return bool(ob)
+    else:
+        return True
+
+def is_equal(a: Any, b: Any) -> bool:
+    if a is None and b is None:
+        return True
+    elif a == None:
+        return False
+    else:
+        return a == b
+
+def stringify(ob: Any) -> str:
+    if ob is None:
+        return 'nil'
+    elif isinstance(ob, float):
+        text = str(ob)
+        if text.endswith(".0"):
+            text = text[0 : len(text) - 2]
+        return text
+    else:
+        return str(ob)
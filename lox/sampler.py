@@ -0,0 +1,129 @@
+import signal
+import threading
+from collections import Counter
+
+from .expr import Call
+from .stmt import Stmt, Return
+from .interpreter import Interpreter
+from .lox_function import LoxFunction, TailCall, TAIL_CALLABLE
+from .profiler import SCRIPT
+
+
+def frame_name(callee, line: int) -> str:
+    if isinstance(callee, LoxFunction):
+        name = callee.declaration.name.lexeme
+    else:
+        name = str(callee)
+    return f"{name}:{line}"
+
+
+class Sampler:
+    """Snapshots a shadow stack `rate` times a second into a histogram.
+
+    Uses a SIGPROF interval timer where one is available on the main
+    thread, which only ticks while the process burns CPU; otherwise a
+    background thread. Only the innermost `depth` frames are kept per
+    sample so deep recursion doesn't make each sample expensive.
+    """
+
+    def __init__(self, stack: list, rate: int = 1000, depth: int = 128):
+        self.stack = stack
+        self.interval = 1.0 / rate
+        self.depth = depth
+        self.samples: Counter = Counter()
+        self._thread: threading.Thread = None
+        self._stopped = threading.Event()
+
+    def sample(self, *_):
+        self.samples[tuple(self.stack[-self.depth:])] += 1
+
+    def start(self):
+        if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGPROF, self.sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        if self._thread is None:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def stacks(self) -> Counter:
+        named = Counter()
+        for stack, count in self.samples.items():
+            named[(SCRIPT,) + tuple(frame_name(callee, line) for callee, line in stack)] += count
+        return named
+
+    def report(self, top: int = 20) -> str:
+        total = sum(self.samples.values())
+        own, anywhere = Counter(), Counter()
+        for stack, count in self.stacks().items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                anywhere[name] += count
+        out = [f"{total} samples", f"{'self':>7} {'total':>7}  function:called from line"]
+        for name, count in own.most_common(top):
+            out.append(f"{100 * count / total:>6.1f}% {100 * anywhere[name] / total:>6.1f}%  {name}")
+        return "\n".join(out)
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as file:
+            for stack, count in sorted(self.stacks().items()):
+                file.write(f"{';'.join(stack)} {count}\n")
+
+
+class SamplingInterpreter(Interpreter):
+    """Tree walker with a shadow stack of Lox calls for Sampler to read.
+
+    Each entry is (callee, line of the call). Keeping it costs an append and
+    a pop per call, and only in this subclass. Lox can't catch a runtime
+    error, so a call that raises doesn't pop; interpret() resets the stack.
+    """
+
+    def __init__(self, rate: int = 1000):
+        super().__init__()
+        self.shadow_stack: list[tuple] = []
+        self.sampler = Sampler(self.shadow_stack, rate)
+
+    def interpret(self, statements: list[Stmt]):
+        self.sampler.start()
+        try:
+            return super().interpret(statements)
+        finally:
+            self.sampler.stop()
+            self.shadow_stack.clear()
+
+    def visit_call_expr(self, expr: Call):
+        callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+        stack = self.shadow_stack
+        stack.append((callee, expr.paren.line))
+        value = self.call(callee, arguments)
+        stack.pop()
+        return value
+
+    def visit_return_stmt(self, stmt: Return):
+        call = stmt.value
+        if type(call) is Call and call.tail:
+            callee = self.evaluate(call.callee)
+            arguments = [self.evaluate(arg) for arg in call.arguments]
+            if type(callee) in TAIL_CALLABLE and len(arguments) == len(callee.declaration.params):
+                # the callee takes over this activation, and so its frame
+                self.shadow_stack[-1] = (callee, call.paren.line)
+                return TailCall(callee, arguments)
+            self.shadow_stack.append((callee, call.paren.line))
+            value = self.call(callee, arguments)
+            self.shadow_stack.pop()
+            return (value,)
+        return (None if call is None else self.evaluate(call),)
@@ -1,4 +1,8 @@
 
+import re
+import sys
+from typing import Iterator
+
 from .token_type import TokenType
 from .token import Token
 
@@ -23,6 +27,45 @@ class Scanner:
         "while": TokenType.WHILE
     }
 
+    OPERATORS = {
+        "(": TokenType.LEFT_PAREN,
+        ")": TokenType.RIGHT_PAREN,
+        "{": TokenType.LEFT_BRACE,
+        "}": TokenType.RIGHT_BRACE,
+        ",": TokenType.COMMA,
+        ".": TokenType.DOT,
+        "-": TokenType.MINUS,
+        "+": TokenType.PLUS,
+        ";": TokenType.SEMICOLON,
+        "*": TokenType.STAR,
+        "/": TokenType.SLASH,
+        "!": TokenType.BANG,
+        "!=": TokenType.BANG_EQUAL,
+        "=": TokenType.EQUAL,
+        "==": TokenType.EQUAL_EQUAL,
+        "<": TokenType.LESS,
+        "<=": TokenType.LESS_EQUAL,
+        ">": TokenType.GREATER,
+        ">=": TokenType.GREATER_EQUAL,
+    }
+
+    # Leading blanks are folded into each match, then one alternative per
+    # token class is tried in order; the catch-all at the end means matches
+    # always tile the whole source.
+    TOKEN_PATTERN = re.compile(r"""
+        [ \t\r]*
+        (?:
+          (?P<newline>\n)
+        | (?P<skip>//[^\n]* | \Z)
+        | (?P<comment>/\*.*?(?:\*/|\Z))
+        | (?P<identifier>[^\W\d]\w*)
+        | (?P<operator>[!=<>]=? | [(){},.\-+;*/])
+        | (?P<number>\d+(?:\.\d+)?)
+        | (?P<string>"[^"]*")
+        | (?P<error>.)
+        )
+    """, re.VERBOSE | re.DOTALL)
+
     class Error(Exception):
         pass
 
@@ -34,6 +77,46 @@ class Scanner:
         self.tokens: list[Token] = []
 
 
+    def iter_tokens(self) -> Iterator[Token]:
+        """Yields tokens lazily using TOKEN_PATTERN instead of a char loop.
+
+        Produces the same tokens as `scan_tokens()`, except that block
+        comments are closed by the first `*/` and count their newlines.
+        """
+        keywords = self.KEYWORDS
+        operators = self.OPERATORS
+        intern = sys.intern
+        IDENTIFIER = TokenType.IDENTIFIER
+        NUMBER = TokenType.NUMBER
+        STRING = TokenType.STRING
+
+        for match in self.TOKEN_PATTERN.finditer(self.source):
+            kind = match.lastgroup
+            if kind == "skip":
+                continue
+            text = match.group(kind)
+            if kind == "identifier":
+                text = intern(text)
+                yield Token(keywords.get(text, IDENTIFIER), text, None, self.line)
+            elif kind == "operator":
+                yield Token(operators[text], text, None, self.line)
+            elif kind == "newline":
+                self.line += 1
+            elif kind == "number":
+                yield Token(NUMBER, text, float(text), self.line)
+            elif kind == "string":
+                # like parse_string, a string carries the line it ends on
+                self.line += text.count("\n")
+                yield Token(STRING, text, text[1:-1], self.line)
+            elif kind == "comment":
+                self.line += text.count("\n")
+            elif text == '"':
+                raise self.Error(f"Unterminated string on line {self.line}")
+            else:
+                raise self.Error(f"Unexpected character on: {self.line}")
+
+        yield Token(TokenType.EOF, "", None, self.line)
+
     def is_at_end(self):
         return self.current >= len(self.source)
     
@@ -108,10 +191,6 @@ class Scanner:
             self.line += 1
         elif c == '"':
             self.parse_string()
-        elif c == 'o':
-            if self.match('r'):
-                add_token(TokenType.OR)
-            
         else:
             if c.isdigit():
                 self.parse_number()
@@ -157,9 +236,10 @@ class Scanner:
         while self.is_alphanumeric(self.peek()):
             self.advance()
         
-        t = self.source[self.start : self.current]
+        # interned, so every occurrence of a name shares one string
+        t = sys.intern(self.source[self.start : self.current])
         token_type = self.KEYWORDS.get(t, TokenType.IDENTIFIER)
-        self.add_token(token_type, None)
+        self.tokens.append(Token(token_type, t, None, self.line))
 
     def match(self, expected: str):
         if self.is_at_end():
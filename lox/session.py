@@ -0,0 +1,196 @@
+"""Embedding API: isolated Lox sessions, and a thread-safe pool of them.
+
+    prototype = Session()
+    prototype.define("limit", 10.0)
+    prototype.run("fun double(x) { return x * 2; }")
+
+    session = prototype.fork()
+    session.run("double(limit);")   # 20.0
+
+    pool = SessionPool(prototype, size=8)
+    pool.run("var n = double(2); n;")   # from any thread
+
+Sessions never share globals or the frames their closures hold on to; a
+fork copies them. Lox and Eng keep one class-level interpreter for the
+command line and the old tests.
+"""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any
+
+from .scanner import Scanner
+from .parser import Parser
+from .resolver import Resolver
+from .stmt import Stmt
+from .interpreter import Interpreter
+from .environment import Environment, GlobalEnvironment
+from .lox_function import LoxFunction, MemoizedFunction
+from .memo import MemoCache
+from .cache import ProgramCache, ResolutionLog
+from .exceptions import error_message
+
+# Front-end results for every session that doesn't bring its own cache, for
+# the most recent scripts. An entry is unpickled afresh on each fetch, so
+# sessions never share AST nodes.
+PROGRAMS = ProgramCache(maxsize=256)
+
+
+class _Copier:
+    """Copies the values one session holds for another interpreter.
+
+    Functions get copies of the frames they close over, each frame copied
+    once so closures that shared one still do; the source's globals become
+    the target's. Everything else, natives included, is shared.
+    """
+
+    def __init__(self, source: GlobalEnvironment, target: Interpreter):
+        self.target = target
+        self.copies: dict[int, Any] = {id(source): target._globals}
+
+    def value(self, value: Any) -> Any:
+        if not isinstance(value, LoxFunction):
+            return value
+        copy = self.copies.get(id(value))
+        if copy is None:
+            copy = self.copies[id(value)] = object.__new__(type(value))
+            copy.__dict__.update(value.__dict__)
+            copy.closure = self.environment(value.closure)
+            if isinstance(value, MemoizedFunction):
+                copy.memo = MemoCache(value.memo.maxsize)
+        return copy
+
+    def environment(self, environment: Environment) -> Environment:
+        if environment is None or isinstance(environment, GlobalEnvironment):
+            return self.copies.get(id(environment), environment)
+        copy = self.copies.get(id(environment))
+        if copy is None:
+            values = environment.values
+            copy = self.target.Environment(self.environment(environment.enclosing), [None] * len(values))
+            # before the values, which may be closures over this very frame
+            self.copies[id(environment)] = copy
+            for slot, value in enumerate(values):
+                copy.assign_at(0, slot, self.value(value))
+        return copy
+
+
+class Session:
+    """One Lox global scope and the tree walker that runs code in it.
+
+    A session runs one script at a time; use one per thread, or check them
+    out of a SessionPool.
+    """
+
+    class CompileError(Exception):
+        pass
+
+    RuntimeError = Interpreter.RuntimeError
+    BudgetExceeded = Interpreter.BudgetExceeded
+
+    engine = Interpreter
+
+    def __init__(self, cache: ProgramCache = PROGRAMS):
+        self.interpreter = self.engine()
+        self.cache = cache
+
+    @property
+    def globals(self) -> dict[str, Any]:
+        return self.interpreter._globals.values
+
+    def define(self, name: str, value: Any):
+        """Defines a global, e.g. a LoxCallable to expose a Python function."""
+        self.interpreter._globals.define(name, value)
+
+    def compile(self, source: str) -> list[Stmt]:
+        program = self.cache.fetch(source, self.interpreter) if self.cache is not None else None
+        if program is not None:
+            return program
+        errors = []
+        resolutions = []
+        try:
+            parser = Parser(Scanner(source).iter_tokens(),
+                            lambda token, message: errors.append(error_message(token, message)))
+            statements = parser.parse()
+            if errors:
+                raise self.CompileError("\n".join(errors))
+            Resolver(ResolutionLog(self.interpreter, resolutions)).resolve(statements)
+        except self.CompileError:
+            raise
+        except Exception as e:
+            # the scanner and resolver raise plain exceptions
+            raise self.CompileError(str(e)) from e
+        if self.cache is not None:
+            self.cache.store(source, self.interpreter, statements, resolutions)
+        return statements
+
+    def run(self, source: str, steps: int = None, seconds: float = None) -> Any:
+        """Runs `source` and returns the value of its last statement, if
+        that is an expression. Raises CompileError or RuntimeError, or
+        BudgetExceeded past `steps` loop iterations and calls or `seconds`."""
+        program = self.compile(source)
+        self.interpreter.limit(steps, seconds)
+        return self.interpreter.interpret(program)
+
+    def fork(self) -> "Session":
+        """A new session starting from a copy of this one's globals."""
+        session = type(self)(self.cache)
+        session.copy_globals(self)
+        return session
+
+    def reset(self, prototype: "Session"):
+        """Puts this session back to a copy of `prototype`'s globals."""
+        interpreter = self.interpreter
+        interpreter.environment = interpreter._globals
+        interpreter._locals.clear()
+        self.copy_globals(prototype)
+
+    def copy_globals(self, source: "Session"):
+        copier = _Copier(source.interpreter._globals, self.interpreter)
+        self.interpreter._globals.replace({name: copier.value(value) for name, value in source.globals.items()})
+
+
+class SessionPool:
+    """Sessions forked from `prototype`, each lent to one thread at a time.
+
+    The pool forks the prototype once, as it is when the pool is made, and
+    copies that snapshot for each new session and back into each returned
+    one, so a script never sees what the last one defined or changed. Up to
+    `size` sessions are made as needed; checkout() waits for one to come
+    back once all are in use.
+    """
+
+    def __init__(self, prototype: Session, size: int):
+        self.snapshot = prototype.fork()
+        self.size = size
+        self.created = 0
+        # last in, first out, so the busiest sessions stay warm
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> Session:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self.created < self.size:
+                self.created += 1
+                return self.snapshot.fork()
+        # raises queue.Empty if the timeout passes
+        return self._idle.get(timeout=timeout)
+
+    def release(self, session: Session):
+        session.reset(self.snapshot)
+        self._idle.put(session)
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        session = self.acquire(timeout)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def run(self, source: str, steps: int = None, seconds: float = None) -> Any:
+        with self.checkout() as session:
+            return session.run(source, steps, seconds)
@@ -15,6 +15,8 @@ class Stmt(ABC):
         def visit_while_stmt(self, stmt): raise NotImplementedError()
         def visit_for_stmt(self, stmt): raise NotImplementedError()
 
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -22,6 +24,8 @@ class Stmt(ABC):
         pass
 
 class Block(Stmt):
+    __slots__ = ("statements",)
+
     def __init__(self, statements: list[Stmt]):
         self.statements = statements
 
@@ -29,6 +33,8 @@ class Block(Stmt):
         return visitor.visit_block_stmt(self)    
 
 class Expression(Stmt):
+    __slots__ = ("expression",)
+
     def __init__(self, expr: Expr):
         self.expression = expr
     
@@ -36,6 +42,8 @@ class Expression(Stmt):
         return visitor.visit_expression_stmt(self)
 
 class Function(Stmt):
+    __slots__ = ("name", "params", "body")
+
     def __init__(self, name: Token, params: list[Token], body: list[Stmt]):
         self.name = name
         self.params = params
@@ -45,6 +53,8 @@ class Function(Stmt):
         return visitor.visit_function_stmt(self)
 
 class If(Stmt):
+    __slots__ = ("condition", "then_branch", "else_branch")
+
     def __init__(self, condition: Expr, then_branch: Stmt, else_branch: Stmt):
         self.condition = condition
         self.then_branch = then_branch
@@ -55,6 +65,8 @@ class If(Stmt):
         return visitor.visit_if_stmt(self)
 
 class Print(Stmt):
+    __slots__ = ("expression",)
+
     def __init__(self, expr: Expr):
         self.expression = expr
     
@@ -63,6 +75,8 @@ class Print(Stmt):
 
 
 class Var(Stmt):
+    __slots__ = ("name", "initializer")
+
     def __init__(self, name: Token, initializer: Expr):
         self.name = name
         self.initializer = initializer
@@ -71,6 +85,8 @@ class Var(Stmt):
         return visitor.visit_var_stmt(self)
 
 class Return(Stmt):
+    __slots__ = ("keyword", "value")
+
     def __init__(self, keyword: Token, value: Expr):
         self.keyword = keyword
         self.value = value
@@ -79,6 +95,8 @@ class Return(Stmt):
         return visitor.visit_return_stmt(self)
 
 class While(Stmt):
+    __slots__ = ("condition", "body")
+
     def __init__(self, condition: Expr, body: Stmt):
         self.condition = condition
         self.body = body
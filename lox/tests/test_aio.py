@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from lox import AsyncSession, AsyncNative
+
+
+@pytest.fixture
+def prototype():
+    session = AsyncSession()
+    events = []
+
+    async def wait(name):
+        events.append(name)
+        await asyncio.sleep(0.001)
+        return name + "!"
+
+    session.define("wait", AsyncNative(wait, 1))
+    session.events = events
+    return session
+
+
+def test_async_native(prototype):
+    source = 'fun greet(n) { return wait(n) + "?"; } greet("a") + greet("b");'
+    assert asyncio.run(prototype.fork().run_async(source)) == "a!?b!?"
+    assert prototype.events == ["a", "b"]
+
+
+def test_scripts_interleave(prototype):
+    spin = "var i = 0; while (i < 5000) { i = i + 1; } i;"
+    waits = 'var s = ""; for (var k = 0; k < 3; k = k + 1) { s = s + wait("w"); } s;'
+    spinner = prototype.fork()
+    spinner.interpreter.slice = 100
+
+    async def both():
+        return await asyncio.gather(spinner.run_async(spin), prototype.fork().run_async(waits))
+
+    assert asyncio.run(both()) == [5000.0, "w!w!w!"]
+    assert spinner.interpreter.switches >= 50
+
+
+def test_same_results_as_blocking_run(prototype, capsys):
+    source = """
+    fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+    fun loop(n, acc) { if (n == 0) return acc; return loop(n - 1, acc + n); }
+    for (var i = 0; i < 8; i = i + 1) print fib(i);
+    loop(5000, 0);
+    """
+    blocking = prototype.fork().run(source)
+    printed = capsys.readouterr().out
+    # the tail call doesn't nest coroutines either
+    assert asyncio.run(prototype.fork().run_async(source)) == blocking == 12502500.0
+    assert capsys.readouterr().out == printed
+
+
+def test_runtime_error(prototype):
+    with pytest.raises(AsyncSession.RuntimeError, match="Undefined variable nope"):
+        asyncio.run(prototype.fork().run_async("wait(nope);"))
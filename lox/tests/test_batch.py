@@ -0,0 +1,52 @@
+import pytest
+
+from lox.__main__ import Lox
+from lox.batch import find_scripts, main, run_batch
+from lox.parser import Parser
+from lox.scanner import Scanner
+
+
+@pytest.fixture
+def scripts(tmp_path, monkeypatch):
+    # workers run in this process for jobs=1; have Lox put back afterwards
+    for name in ("interpreter", "use_cache", "optimize", "had_error", "had_runtime_error"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.lox").write_text('var x = 1; print "a" + x;')
+    (tmp_path / "b.lox").write_text("print x;")
+    (tmp_path / "sub" / "c.lox").write_text("print 1 +;\nprint 2;")
+    (tmp_path / "notes.txt").write_text("not a script")
+    return tmp_path
+
+
+def test_find_scripts(scripts):
+    found = find_scripts([str(scripts)])
+    assert [p[len(str(scripts)) + 1:] for p in found] == ["a.lox", "b.lox", "sub/c.lox"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_each_script_isolated(scripts, jobs):
+    results = run_batch(find_scripts([str(scripts)]), jobs, use_cache=False)
+    assert [(r.status, r.stdout) for r in results] == [
+        (0, "a1.0\n"),
+        # `x` from a.lox isn't visible here
+        (70, ""),
+        (65, "1 at ; Expect expression.\n"),
+    ]
+    assert "Undefined variable x" in results[1].stderr
+
+
+def test_output_files_follow_the_tree(scripts, tmp_path_factory):
+    (scripts / "sub" / "a.lox").write_text('print "sub";')
+    output = tmp_path_factory.mktemp("output")
+    with pytest.raises(SystemExit):
+        main(["--jobs", "1", "--no-cache", "--output", str(output), str(scripts / "a.lox"), str(scripts / "sub")])
+    # same base name, different directories
+    assert (output / "a.out").read_text() == "a1.0\n"
+    assert (output / "sub" / "a.out").read_text() == "sub\n"
+    assert (output / "sub" / "c.err").exists()
+
+
+def test_parser_recovers_after_error():
+    statements = Parser(Scanner("print 1 +; var = 2; print 3;").iter_tokens()).parse()
+    assert [type(s).__name__ for s in statements] == ["NoneType", "NoneType", "Print"]
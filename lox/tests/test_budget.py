@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+
+from lox import Session, AsyncSession
+from lox.__main__ import Lox
+from lox.jit import LoopJit
+
+SPIN = "var i = 0; while (true) { i = i + 1; }"
+
+
+@pytest.fixture(params=["tree", "jit"])
+def session(request):
+    session = Session(cache=None)
+    if request.param == "jit":
+        session.interpreter.jit = LoopJit(session.interpreter, threshold=10)
+    session.run("""
+    fun count(n) { var i = 0; while (i < n) { i = i + 1; } return i; }
+    fun forever(n) { return forever(n + 1); }
+    """)
+    return session
+
+
+def test_step_budget_is_exact(session):
+    # one step for the call, one per iteration
+    assert session.run("count(50000);", steps=50001) == 50000.0
+    with pytest.raises(Session.BudgetExceeded, match="Step budget of 50000 exhausted"):
+        session.run("count(50000);", steps=50000)
+    # the next run gets a budget of its own
+    assert session.run("count(50000);") == 50000.0
+
+
+@pytest.mark.parametrize("source", [SPIN, "forever(0);"])
+def test_deadline_stops_runaway_scripts(session, source):
+    start = time.monotonic()
+    with pytest.raises(Session.BudgetExceeded, match="Timed out after 0.05 seconds"):
+        session.run(source, seconds=0.05)
+    assert time.monotonic() - start < 1
+
+
+def test_async_budget():
+    session = AsyncSession(cache=None)
+    with pytest.raises(Session.BudgetExceeded):
+        asyncio.run(session.run_async(SPIN, steps=1000))
+    assert session.interpreter.steps_used() == 1001
+
+
+def test_command_line(tmp_path, capsys, monkeypatch):
+    for name in ("interpreter", "had_runtime_error", "use_cache"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    script = tmp_path / "spin.lox"
+    script.write_text(SPIN)
+    with pytest.raises(SystemExit) as exit:
+        Lox.main(["--no-cache", "--max-steps", "2000", str(script)])
+    assert exit.value.code == 70
+    assert "Step budget of 2000 exhausted." in capsys.readouterr().err
@@ -0,0 +1,78 @@
+from lox.__main__ import Lox
+from lox.cache import ProgramCache
+from lox.interpreter import Interpreter
+from lox.vm import VM
+
+SOURCE = "fun add(a, b) { var c = a + b; return c; }\nprint add(1, 2);"
+
+
+def test_hit_skips_front_end(tmp_path, capsys, monkeypatch):
+    Lox.interpreter = Interpreter()
+    monkeypatch.setattr(Lox, "program_cache", ProgramCache(str(tmp_path)))
+    Lox.run(SOURCE)
+    assert [p.suffix for p in tmp_path.iterdir()] == [".loxc"]
+
+    # a fresh cache and engine load the resolved program from disk
+    Lox.interpreter = VM()
+    monkeypatch.setattr(Lox, "program_cache", ProgramCache(str(tmp_path)))
+    monkeypatch.setattr(Lox, "front_end", None)
+    Lox.run(SOURCE)
+    assert capsys.readouterr().out == "3\n3\n"
+    assert (Lox.program_cache.hits, Lox.program_cache.misses) == (1, 0)
+
+
+def test_version_and_corruption_miss(tmp_path, monkeypatch):
+    cache = ProgramCache(str(tmp_path))
+    Lox.interpreter = Interpreter()
+    resolutions = []
+    cache.store(SOURCE, Lox.interpreter, Lox.front_end(SOURCE, resolutions), resolutions)
+
+    monkeypatch.setattr(ProgramCache, "version", ProgramCache.version + 1)
+    assert ProgramCache(str(tmp_path)).fetch(SOURCE, Lox.interpreter) is None
+    monkeypatch.undo()
+
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(path.read_bytes()[:20])
+    cache = ProgramCache(str(tmp_path))
+    assert cache.fetch(SOURCE, Lox.interpreter) is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_no_cache_flag(tmp_path, capsys, monkeypatch):
+    script = tmp_path / "add.lox"
+    script.write_text(SOURCE)
+    monkeypatch.setattr(Lox, "program_cache", ProgramCache())
+    try:
+        Lox.main(["--no-cache", str(script)])
+    finally:
+        Lox.use_cache = True
+    assert capsys.readouterr().out == "3\n"
+    assert not (tmp_path / "__loxcache__").exists()
+
+
+def test_edited_script_replaces_its_entry(tmp_path, capsys, monkeypatch):
+    script = tmp_path / "add.lox"
+    monkeypatch.setattr(Lox, "program_cache", ProgramCache())
+    monkeypatch.setattr(Lox, "interpreter", Interpreter())
+    for n in range(3):
+        script.write_text(f"print {n};")
+        Lox.main([str(script)])
+    assert capsys.readouterr().out == "0\n1\n2\n"
+    assert [p.name for p in (tmp_path / "__loxcache__").iterdir()] == ["add.O0.loxc"]
+
+    # the file holds the last version; the others miss
+    cache = ProgramCache(str(tmp_path / "__loxcache__"))
+    cache.script, cache.options = "add", "O0"
+    assert cache.fetch("print 1;", Lox.interpreter) is None
+    assert cache.fetch("print 2;", Lox.interpreter) is not None
+
+
+def test_memory_is_bounded(monkeypatch):
+    cache = ProgramCache(maxsize=2)
+    monkeypatch.setattr(Lox, "interpreter", Interpreter())
+    for source in ["1;", "2;", "3;"]:
+        resolutions = []
+        cache.store(source, Lox.interpreter, Lox.front_end(source, resolutions), resolutions)
+    assert len(cache.entries) == 2
+    assert cache.fetch("1;", Lox.interpreter) is None
+    assert cache.fetch("3;", Lox.interpreter) is not None
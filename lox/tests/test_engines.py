@@ -0,0 +1,101 @@
+import glob
+import os
+
+import pytest
+
+from lox.__main__ import Lox
+from lox.engines import ENGINES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCRIPTS = sorted(glob.glob(os.path.join(ROOT, "*.lox")))
+
+
+def run(source, engine, capsys):
+    Lox.interpreter = ENGINES[engine]()
+    Lox.run(source)
+    return capsys.readouterr().out
+
+
+@pytest.mark.parametrize("engine", sorted(set(ENGINES) - {"tree"}))
+@pytest.mark.parametrize("script", SCRIPTS, ids=os.path.basename)
+def test_matches_tree_walker(script, engine, capsys):
+    with open(script) as file:
+        source = file.read()
+    assert run(source, engine, capsys) == run(source, "tree", capsys)
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_closures(engine, capsys):
+    source = """
+    fun counter() { var i = 0; fun inc() { i = i + 1; return i; } return inc; }
+    var a = counter(); var b = counter();
+    a(); a();
+    print a();
+    print b();
+    for (var i = 0; i < 2; i = i + 1) { var j = i; fun show() { print j; } show(); }
+    """
+    assert run(source, engine, capsys) == "3\n1\n0\n1\n"
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_return_from_nested_statements(engine, capsys):
+    source = """
+    fun find(n) {
+      var i = 0;
+      while (true) {
+        { if (i == n) { return i; } }
+        i = i + 1;
+      }
+    }
+    fun none() { if (false) return 1; }
+    print find(3);
+    print none();
+    find(2);
+    """
+    assert run(source, engine, capsys) == "3\nnil\n2.0\n"
+
+
+DEEP = """
+fun depth(n) { if (n == 0) return 0; return depth(n - 1) + 1; }
+print depth(%d);
+"""
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_stack_overflow_is_a_runtime_error(engine, capsys):
+    Lox.interpreter = ENGINES[engine]()
+    if engine == "vm":
+        Lox.interpreter.max_depth = 1000
+    Lox.had_runtime_error = False
+    try:
+        Lox.run(DEEP % 100000)
+        assert Lox.had_runtime_error
+    finally:
+        Lox.had_runtime_error = False
+    assert "Stack overflow." in capsys.readouterr().err
+
+
+def test_vm_recursion_is_not_bound_by_python(capsys):
+    assert run(DEEP % 50000, "vm", capsys) == "50000\n"
+
+
+@pytest.mark.parametrize("engine", ["tree", "vm"])
+def test_tail_calls_run_in_constant_stack(engine, capsys):
+    source = """
+    fun loop(n, acc) { if (n == 0) return acc; return loop(n - 1, acc + 1); }
+    fun now() { return clock(); }
+    print loop(20000, 0);
+    print now() > 0;
+    """
+    assert run(source, engine, capsys) == "20000\nTrue\n"
+    if engine == "vm":
+        Lox.interpreter.max_depth = 10
+    Lox.run("fun f(n) { if (n == 0) return 0; return f(n - 1); } print f(1000);")
+    assert capsys.readouterr().out == "0\n"
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_signed_zero_constants(engine, capsys, monkeypatch):
+    # -O1 folds -0 into a constant of its own, equal to 0
+    monkeypatch.setattr(Lox, "optimize", 1)
+    assert run("print 0; print -0;", engine, capsys) == "0\n-0\n"
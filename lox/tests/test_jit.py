@@ -0,0 +1,92 @@
+import pytest
+
+from lox.__main__ import Lox
+from lox.interpreter import Interpreter
+from lox.jit import LoopJit
+
+PROGRAMS = {
+    "numeric": """
+var i = 0; var total = 0;
+while (i < 500) { total = total + i / 2; i = i + 1; }
+print total;
+""",
+    "blocks and nested loops": """
+fun grid(n) {
+  var cells = 0;
+  for (var x = 0; x < n; x = x + 1) {
+    var y = 0;
+    while (y < n) { var c = x * y; if (c > 10 and !(c == 12)) cells = cells + 1; y = y + 1; }
+  }
+  return cells;
+}
+print grid(30);
+""",
+    "strings and mixed +": """
+var s = ""; var n = 0;
+while (n < 300) { s = s + "ab"; n = n + 1; }
+print s == "";
+var t = 0;
+while (t < 300) { if (t == 200) t = "x" + t; else t = t + 1; }
+print t;
+""",
+    "return and tail call from a loop": """
+fun done(x) { return x; }
+fun find(limit) {
+  var i = 0;
+  while (true) { if (i * i > limit) return done(i); i = i + 1; }
+}
+print find(100000);
+""",
+    "calls and closures": """
+var total = 0;
+fun add(x) { total = total + x; }
+var i = 0;
+while (i < 300) { add(i); i = i + 1; }
+print total;
+var k = 0;
+while (k < 300) { fun f() { return k; } k = f() + 1; }
+print k;
+""",
+    "guard fails": """
+fun double(x) {
+  var i = 0;
+  while (i < 4) { x = x + x; i = i + 1; }
+  return x;
+}
+var j = 0;
+while (j < 200) { double(j); j = j + 1; }
+print double(1);
+print double("ab");
+print double(true);
+""",
+    "runtime error": """
+var i = 0;
+while (i < 1000) { if (i == 900) i = nil; i = i + 1; print i < 0; }
+""",
+}
+
+
+def run(source: str, jit: bool, capsys) -> str:
+    Lox.interpreter = Interpreter()
+    if jit:
+        Lox.interpreter.jit = LoopJit(Lox.interpreter, threshold=10)
+    Lox.run(source)
+    out, err = capsys.readouterr()
+    return out + err
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_same_output_as_tree_walker(name, capsys, monkeypatch):
+    monkeypatch.setattr(Lox, "use_cache", False)
+    monkeypatch.setattr(Lox, "had_runtime_error", False)
+    expected = run(PROGRAMS[name], False, capsys)
+    assert run(PROGRAMS[name], True, capsys) == expected
+
+
+def test_stats(capsys, monkeypatch):
+    monkeypatch.setattr(Lox, "use_cache", False)
+    monkeypatch.setattr(Lox, "had_runtime_error", False)
+    run(PROGRAMS["guard fails"] + PROGRAMS["calls and closures"], True, capsys)
+    # double's loop got hot on floats, so "ab" fails its guard and the loop
+    # goes back to counting; the loop declaring `f` can't be compiled
+    assert Lox.interpreter.jit.stats() == "3 loops compiled, 1 unsupported, 1 deopts"
@@ -0,0 +1,67 @@
+import pytest
+
+from lox.__main__ import Lox
+from lox.interpreter import Interpreter
+from lox.memo import MemoCache
+from lox.purity import PurityAnalysis
+
+SOURCE = """
+var k = 1;
+fun sq(x) { return x * x; }
+fun sumsq(a, b) { var t = sq(a); { t = t + sq(b); } return t; }
+fun usesk(x) { return x + k; }
+fun timed() { return clock(); }
+fun callsimpure(x) { return timed() + x; }
+fun higher(f, x) { return f(x); }
+fun prints(x) { print x; return x; }
+fun makes() { fun inner() { return 1; } return inner; }
+fun setsk(x) { k = x; return x; }
+"""
+
+
+def test_pure_functions():
+    Lox.interpreter = Interpreter()
+    statements = Lox.front_end(SOURCE)
+    pure = PurityAnalysis(Lox.interpreter._locals).pure_functions(statements)
+    assert sorted(f.name.lexeme for f in pure) == ["sq", "sumsq"]
+
+
+def test_lru_evicts_least_recently_used():
+    memo = MemoCache(2)
+    memo.put(1, "a")
+    memo.put(2, "b")
+    assert memo.get(1) == "a"
+    memo.put(3, "c")
+    assert memo.get(2) is None
+    assert (memo.hits, memo.misses, len(memo)) == (1, 1, 2)
+
+
+@pytest.fixture(autouse=True)
+def restore(monkeypatch):
+    for name in ("interpreter", "memoize", "use_cache"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    Lox.use_cache = False
+
+
+def test_memoized_fib(capsys):
+    Lox.interpreter = Interpreter()
+    Lox.memoize = True
+    Lox.run("fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }\nprint fib(30);")
+    assert capsys.readouterr().out == "832040\n"
+    assert Lox.interpreter.memo_stats() == ["fib: 28 hits, 31 misses, 31/1024 entries"]
+
+
+def test_memo_keeps_the_sign_of_zero(capsys):
+    Lox.interpreter = Interpreter()
+    Lox.memoize = True
+    Lox.run("fun id(x) { return x; }\nprint id(0); print id(-0); print id(0);")
+    assert capsys.readouterr().out == "0\n-0\n0\n"
+
+
+def test_memoized_tail_calls_run_in_constant_stack(capsys):
+    Lox.interpreter = Interpreter()
+    Lox.memoize = True
+    Lox.run("fun count(n) { if (n == 0) return 0; return count(n - 1); }\nprint count(3000); print count(3000);")
+    assert capsys.readouterr().out == "0\n0\n"
+    # the first call's result, stored under its own arguments
+    assert Lox.interpreter.memo_stats() == ["count: 1 hits, 1 misses, 1/1024 entries"]
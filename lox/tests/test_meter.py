@@ -0,0 +1,61 @@
+import sys
+
+import pytest
+
+from lox.__main__ import Lox
+from lox.meter import MeteredInterpreter, MeteredSession, FRAME
+
+
+@pytest.fixture
+def session():
+    session = MeteredSession(cache=None)
+    session.run("""
+    fun build(n) { var s = ""; for (var i = 0; i < n; i = i + 1) s = s + "0123456789"; return s; }
+    fun depth(n) { if (n == 0) return 0; return depth(n - 1) + 1; }
+    fun chain(n, f) { fun g() { return f; } if (n == 0) return g; return chain(n - 1, g); }
+    """)
+    return session
+
+
+def test_strings_are_charged_for_what_is_held(session):
+    meter = session.interpreter.meter
+    assert len(session.run("var kept = build(1000); kept;")) == 10000
+    # the final string, not every intermediate copy
+    assert meter.peaks["strings"] < 2 * sys.getsizeof("x" * 10000)
+    assert meter.strings == sys.getsizeof("x" * 10000)
+    session.run("kept = nil;")
+    assert meter.strings == 0
+
+
+def test_frames_are_released(session):
+    meter = session.interpreter.meter
+    before = meter.live
+    assert session.run("depth(50);") == 50.0
+    assert meter.live == before
+    assert meter.peaks["frames"] > 50 * FRAME
+    # peaks restart with each run
+    session.run("1;")
+    assert meter.peak == before
+
+
+@pytest.mark.parametrize("source", [
+    'var s = ""; while (true) s = s + "0123456789";',
+    "chain(100000, nil);",
+])
+def test_limit(session, source):
+    with pytest.raises(MeteredInterpreter.MemoryLimitExceeded, match="Memory limit of 100000 bytes"):
+        session.run(source, memory=100000)
+    assert session.interpreter.meter.peak < 110000
+    # a distinct runtime error, like running out of steps
+    assert issubclass(MeteredInterpreter.MemoryLimitExceeded, MeteredSession.BudgetExceeded)
+
+
+def test_memory_stats(tmp_path, capsys, monkeypatch):
+    for name in ("interpreter", "use_cache", "memory_stats"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    script = tmp_path / "strings.lox"
+    script.write_text('var s = "abc"; print s + s;')
+    Lox.main(["--no-cache", "--memory-stats", str(script)])
+    out, err = capsys.readouterr()
+    assert out == "abcabc\n"
+    assert err.startswith("memory peak ")
@@ -0,0 +1,76 @@
+import glob
+import os
+
+import pytest
+
+from lox.__main__ import Lox
+from lox.engines import ENGINES
+from lox.expr import Literal, Variable
+from lox.interpreter import Interpreter
+from lox.stmt import Block, If, Return
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCRIPTS = sorted(glob.glob(os.path.join(ROOT, "*.lox")))
+
+SOURCE = """
+fun f(n) {
+  var k = 2 * 3;
+  var c = 0;
+  if (k > 5) { c = c + k; } else { print "no"; }
+  return c + n;
+  print "dead";
+}
+"""
+
+
+def optimize(source, level):
+    Lox.interpreter = Interpreter()
+    Lox.optimize = level
+    try:
+        return Lox.front_end(source)
+    finally:
+        Lox.optimize = 0
+
+
+def test_folds_and_drops_dead_code():
+    (f,) = optimize(SOURCE, 1)
+    assert isinstance(f.body[0].initializer, Literal) and f.body[0].initializer.value == 6.0
+    assert isinstance(f.body[2], If)
+    assert isinstance(f.body[-1], Return)
+
+
+def test_propagates_unassigned_locals():
+    (f,) = optimize(SOURCE, 2)
+    assert isinstance(f.body[2], Block)
+    assert len(f.body) == 4
+    # the reads of k are gone from the resolution table too
+    locals_ = Lox.interpreter._locals
+    assert not [e for e in locals_ if isinstance(e, Variable) and e.name.lexeme == "k"]
+    assert len(locals_) == 4
+
+
+def test_top_level_if_keeps_its_value(capsys):
+    Lox.interpreter = Interpreter()
+    Lox.optimize = 2
+    try:
+        Lox.run("fun f() { return 1; }\nf();\nif (false) print 2;")
+    finally:
+        Lox.optimize = 0
+    assert capsys.readouterr().out == ""
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+@pytest.mark.parametrize("script", SCRIPTS, ids=os.path.basename)
+def test_same_output(script, engine, capsys):
+    with open(script) as file:
+        source = file.read()
+    outputs = []
+    for level in (0, 2):
+        Lox.interpreter = ENGINES[engine]()
+        Lox.optimize = level
+        try:
+            Lox.run(source)
+        finally:
+            Lox.optimize = 0
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
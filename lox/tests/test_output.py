@@ -0,0 +1,54 @@
+import pytest
+
+from lox.__main__ import Lox
+from lox.engines import ENGINES
+from lox.jit import LoopJit
+from lox.output import CallbackOutput, ListOutput
+
+SOURCE = """
+fun show(x) { print x; }
+var i = 0;
+while (i < 200) { print i; i = i + 1; }
+show("done");
+"""
+LINES = [str(i) for i in range(200)] + ["done"]
+
+
+@pytest.fixture(autouse=True)
+def restore(monkeypatch):
+    for name in ("interpreter", "use_cache", "had_runtime_error"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    Lox.use_cache = False
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES) + ["jit"])
+def test_list_output(engine, capsys):
+    if engine == "jit":
+        Lox.interpreter = ENGINES["tree"]()
+        Lox.interpreter.jit = LoopJit(Lox.interpreter, threshold=10)
+    else:
+        Lox.interpreter = ENGINES[engine]()
+    Lox.interpreter.output = output = ListOutput()
+    Lox.run(SOURCE)
+    assert output.lines == LINES
+    assert capsys.readouterr().out == ""
+
+
+def test_callback_batches_by_size():
+    batches = []
+    Lox.interpreter = ENGINES["tree"]()
+    Lox.interpreter.output = CallbackOutput(batches.append, threshold=100)
+    Lox.run(SOURCE)
+    assert "".join(batches) == "".join(line + "\n" for line in LINES)
+    # one write per ~100 characters, and the rest when the run ended
+    assert len(batches) == 7
+    assert all(len(batch) >= 100 for batch in batches[:-1])
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_flushed_before_runtime_error(engine, capsys):
+    Lox.interpreter = ENGINES[engine]()
+    Lox.run('print "before"; print nope;')
+    out, err = capsys.readouterr()
+    assert out == "before\n"
+    assert "nope" in err
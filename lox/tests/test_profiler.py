@@ -0,0 +1,52 @@
+from lox.__main__ import Lox
+from lox.profiler import ProfilingInterpreter, SCRIPT
+
+SOURCE = """fun fib(n) {
+  if (n < 2) return n;
+  return fib(n - 1) + fib(n - 2);
+}
+print fib(10);
+"""
+
+
+def test_report_and_collapsed_stacks(tmp_path, capsys, monkeypatch):
+    script = tmp_path / "fib.lox"
+    script.write_text(SOURCE)
+    # main() sets these on the class; have them put back afterwards
+    for name in ("interpreter", "use_cache", "profiler", "profile_stacks"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    Lox.main(["--profile", "--no-cache", str(script)])
+    out, err = capsys.readouterr()
+    assert out == "55\n"
+    assert "     177" in err and "fib (line 1)" in err
+
+    stacks = (tmp_path / "fib.folded").read_text().splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    assert any(line.startswith("<script>;fib;fib ") for line in stacks)
+
+
+def test_counts_and_line_hits():
+    interpreter = Lox.interpreter = ProfilingInterpreter()
+    Lox.run(SOURCE)
+    profile = interpreter.profile
+    # the if runs on every call, and its `return n` on the 89 leaf calls
+    assert profile.lines[2] == 177 + 89
+    assert profile.lines[3] == 88
+    assert profile.lines[5] == 1
+    (fib,) = [s for s in profile.functions.values() if s.name == "fib"]
+    assert fib.calls == 177
+    assert fib.inclusive <= profile.functions[SCRIPT].inclusive
+
+
+def test_tail_calls_stay_tail_calls(tmp_path, capsys, monkeypatch):
+    script = tmp_path / "count.lox"
+    script.write_text("fun count(n) { if (n == 0) return 0; return count(n - 1); }\nprint count(3000);\n")
+    for name in ("interpreter", "use_cache", "profiler", "profile_stacks"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    Lox.main(["--profile", "--no-cache", str(script)])
+    out, err = capsys.readouterr()
+    assert out == "0\n"
+    # each replaced frame is still a call, one level below the script
+    assert "    3001" in err and "count (line 1)" in err
+    stacks = (tmp_path / "count.folded").read_text().splitlines()
+    assert not any(line.startswith("<script>;count;count") for line in stacks)
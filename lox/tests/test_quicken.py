@@ -0,0 +1,51 @@
+from lox.__main__ import Lox
+from lox.expr import AstPrinter, Binary, AddFloat, Concat, GenericBinary
+from lox.interpreter import Interpreter
+from lox.stmt import Function, Return
+
+
+def program(source: str):
+    Lox.interpreter = Interpreter()
+    return Lox.front_end(source)
+
+
+def returned(statements) -> Binary:
+    (function,) = [s for s in statements if isinstance(s, Function)]
+    (ret,) = [s for s in function.body if isinstance(s, Return)]
+    return ret.value
+
+
+def test_quickens_and_deoptimizes():
+    statements = program("fun add(a, b) { return a + b; }")
+    interpreter = Lox.interpreter
+    interpreter.interpret(statements)
+    node = returned(statements)
+    add = interpreter._globals.values["add"]
+    assert type(node) is Binary
+
+    assert interpreter.call(add, [1.0, 2.0]) == 3.0
+    assert type(node) is AddFloat
+    # the guard fails, and the node stays generic from then on
+    assert interpreter.call(add, ["a", 1.0]) == "a1.0"
+    assert type(node) is GenericBinary
+    assert interpreter.call(add, [1.0, 2.0]) == 3.0
+    assert type(node) is GenericBinary
+    assert interpreter.quicken_stats() == ["AddFloat: 1 quickened, 1 deoptimized"]
+
+
+def test_other_visitors_see_binary():
+    (statement,) = program('"x" + "y";')
+    node = statement.expression
+    assert Lox.interpreter.evaluate(node) == "xy"
+    assert type(node) is Concat
+    assert AstPrinter()._print(node) == "(+ x y)"
+
+
+def test_errors_after_quickening(capsys, monkeypatch):
+    monkeypatch.setattr(Lox, "use_cache", False)
+    monkeypatch.setattr(Lox, "had_runtime_error", False)
+    Lox.interpreter = Interpreter()
+    Lox.run("fun f(a, b) { return a / b; } print f(6, 3); print f(1, 0);")
+    out, err = capsys.readouterr()
+    assert out == "2\n"
+    assert "Division by 0" in err
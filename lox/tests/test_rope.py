@@ -0,0 +1,101 @@
+import pytest
+
+from lox import Session
+from lox.__main__ import Lox
+from lox.engines import ENGINES
+from lox.jit import LoopJit
+from lox.lox_callable import LoxCallable
+from lox.output import ListOutput
+from lox.rope import ROPE_MIN, Rope, concat
+
+SOURCE = """
+var s = "";
+for (var i = 0; i < 3000; i = i + 1) s = s + "ab";
+var t = "";
+for (var i = 0; i < 3000; i = i + 1) t = "ab" + t;
+print s == t;
+print s == t + "!";
+print s + "" == s;
+var n = "";
+for (var i = 0; i < 400; i = i + 1) n = n + i + nil + true;
+print n;
+if (s) print "truthy";
+"""
+
+
+@pytest.fixture(autouse=True)
+def restore(monkeypatch):
+    for name in ("interpreter", "use_cache", "had_runtime_error", "optimize"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    Lox.use_cache = False
+
+
+def run(engine):
+    if engine == "jit":
+        Lox.interpreter = ENGINES["tree"]()
+        Lox.interpreter.jit = LoopJit(Lox.interpreter, threshold=10)
+    else:
+        Lox.interpreter = ENGINES[engine]()
+    Lox.interpreter.output = output = ListOutput()
+    Lox.run(SOURCE)
+    assert not Lox.had_runtime_error
+    return output.lines
+
+
+def test_engines_agree():
+    expected = run("vm")
+    assert expected[:3] == ["True", "False", "True"]
+    for engine in ["tree", "jit"]:
+        assert run(engine) == expected
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_folded_constants_are_str(engine):
+    # folded at -O1 into one long literal, which every engine must take
+    Lox.optimize = 1
+    Lox.interpreter = ENGINES[engine]()
+    Lox.interpreter.output = output = ListOutput()
+    Lox.run(f'print "{"a" * ROPE_MIN}" + "b";')
+    assert not Lox.had_runtime_error
+    assert output.lines == ["a" * ROPE_MIN + "b"]
+
+
+def test_short_strings_stay_str():
+    assert type(concat("a" * 10, "b")) is str
+    rope = concat("a" * ROPE_MIN, "b")
+    assert type(rope) is Rope
+    assert rope == "a" * ROPE_MIN + "b"
+    assert hash(rope) == hash(str(rope))
+
+
+def test_equality_of_different_lengths_does_not_flatten():
+    rope = concat("a" * ROPE_MIN, "b")
+    assert rope != "b"
+    assert rope != 1.0
+    assert rope.right is not None
+
+
+def test_long_chains_flatten():
+    rope = ""
+    for i in range(100000):
+        rope = concat(rope, "x")
+    assert str(rope) == "x" * 100000
+    # the pieces are let go once joined
+    assert rope.right is None
+
+
+def test_python_sees_str():
+    seen = []
+
+    class Keep(LoxCallable):
+        def arity(self):
+            return 1
+
+        def call(self, interpreter, arguments):
+            seen.append(arguments[0])
+
+    session = Session(cache=None)
+    session.define("keep", Keep())
+    value = session.run('var s = ""; for (var i = 0; i < 1000; i = i + 1) s = s + "xy"; keep(s); s;')
+    assert type(value) is str and value == "xy" * 1000
+    assert type(seen[0]) is str
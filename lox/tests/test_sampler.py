@@ -0,0 +1,44 @@
+from lox.__main__ import Lox
+from lox.lox_callable import LoxCallable
+from lox.sampler import SamplingInterpreter
+
+SOURCE = """fun leaf() { snap(); }
+fun inner() { leaf(); }
+fun count(n) {
+  if (n == 0) return inner();
+  return count(n - 1);
+}
+count(3);
+"""
+
+
+class Snap(LoxCallable):
+    # takes a sample on demand, so the test doesn't depend on timing
+    def call(self, interpreter, arguments: list):
+        interpreter.sampler.sample()
+
+
+def test_shadow_stack_follows_calls_and_tail_calls():
+    interpreter = Lox.interpreter = SamplingInterpreter(rate=1)
+    interpreter._globals.define("snap", Snap())
+    Lox.run(SOURCE)
+    # count's tail calls reuse its frame, which now names line 5, and the
+    # final `return inner()` replaces it again
+    assert dict(interpreter.sampler.stacks()) == {
+        ("<script>", "inner:4", "leaf:2", "<native fn>:1"): 1,
+    }
+    assert interpreter.shadow_stack == []
+
+
+def test_sample_flag_reports_histogram(tmp_path, capsys, monkeypatch):
+    script = tmp_path / "loop.lox"
+    script.write_text("var i = 0;\nfun f(x) { return x + 1; }\n"
+                      "while (i < 20000) i = f(i);\nprint i;\n")
+    # main() sets these on the class; have them put back afterwards
+    for name in ("interpreter", "use_cache", "profiler", "profile_stacks"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+    Lox.main(["--sample", "--sample-rate", "2000", "--no-cache", str(script)])
+    out, err = capsys.readouterr()
+    assert out == "20000\n"
+    assert err.splitlines()[0].endswith(" samples")
+    assert all(line.startswith("<script>") for line in (tmp_path / "loop.folded").read_text().splitlines())
@@ -0,0 +1,38 @@
+import glob
+import os
+
+import pytest
+
+from lox.scanner import Scanner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCRIPTS = sorted(glob.glob(os.path.join(ROOT, "*.lox")))
+
+
+def tokens(source, method):
+    return [(t.type, t.lexeme, t.literal, t.line) for t in getattr(Scanner(source), method)()]
+
+
+@pytest.mark.parametrize("path", SCRIPTS, ids=os.path.basename)
+def test_iter_tokens_matches_scan_tokens(path):
+    with open(path) as f:
+        source = f.read()
+    assert tokens(source, "iter_tokens") == tokens(source, "scan_tokens")
+
+
+def test_iter_tokens_lines():
+    source = 'var a = "x\ny"; // c\n/* b\n */ a >= 1.5;'
+    lines = [(t.lexeme, t.line) for t in Scanner(source).iter_tokens()]
+    assert lines == [
+        ("var", 1), ("a", 1), ("=", 1), ('"x\ny"', 2), (";", 2),
+        ("a", 4), (">=", 4), ("1.5", 4), (";", 4), ("", 4),
+    ]
+
+
+@pytest.mark.parametrize("source, message", [
+    ('"abc', "Unterminated string on line 1"),
+    ("\n@", "Unexpected character on: 2"),
+])
+def test_iter_tokens_errors(source, message):
+    with pytest.raises(Scanner.Error, match=message):
+        list(Scanner(source).iter_tokens())
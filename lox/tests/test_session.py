@@ -0,0 +1,123 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from lox import Session, SessionPool
+from lox.lox_callable import LoxCallable
+
+
+class Twice(LoxCallable):
+    def arity(self) -> int:
+        return 1
+
+    def call(self, interpreter, arguments: list):
+        return arguments[0] * 2
+
+
+@pytest.fixture
+def prototype():
+    session = Session()
+    session.define("twice", Twice())
+    session.run("var base = 10; fun add(x) { return base + x; }")
+    return session
+
+
+def test_forks_are_isolated(prototype):
+    a, b = prototype.fork(), prototype.fork()
+    assert a.run("base = 1; add(twice(3));") == 7.0
+    assert b.run("add(1);") == 11.0
+    a.run("var extra = 1;")
+    with pytest.raises(Session.RuntimeError):
+        b.run("extra;")
+    assert "extra" not in prototype.globals
+
+
+def test_compile_errors_raise(prototype):
+    with pytest.raises(Session.CompileError, match="Expect expression"):
+        prototype.fork().run("print 1 +;")
+    with pytest.raises(Session.CompileError):
+        prototype.fork().run("{ var a = a; }")
+
+
+def test_pool_resets_sessions(prototype):
+    pool = SessionPool(prototype, size=1)
+    assert pool.run("var leaked = 1; base = 0; add(1);") == 1.0
+    with pytest.raises(Session.RuntimeError):
+        pool.run("leaked;")
+    assert pool.run("add(1);") == 11.0
+    assert pool.created == 1
+
+
+def test_pool_across_threads(prototype):
+    pool = SessionPool(prototype, size=3)
+    barrier = threading.Barrier(3)
+    results = {}
+
+    def work(n):
+        with pool.checkout() as session:
+            # all three hold a session at once
+            barrier.wait()
+            results[n] = session.run(f"var mine = {n}; add(mine);")
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {0: 10.0, 1: 11.0, 2: 12.0}
+    assert pool.created == 3
+
+
+COUNTER = """
+fun mk() {
+  var n = 0;
+  fun inc() { n = n + 1; return n; }
+  fun get() { return n; }
+  counted = get;
+  return inc;
+}
+var counted;
+var counter = mk();
+"""
+
+
+def test_forks_have_their_own_closures():
+    prototype = Session()
+    prototype.run(COUNTER)
+    a = prototype.fork()
+    assert [a.run("counter();") for _ in range(3)] == [1.0, 2.0, 3.0]
+    # closures that shared a frame still do
+    assert a.run("counted();") == 3.0
+    assert prototype.fork().run("counter();") == 1.0
+    # a fork copies the frames as they are
+    assert a.fork().run("counter();") == 4.0
+    pool = SessionPool(prototype, size=1)
+    assert [pool.run("counter();") for _ in range(3)] == [1.0, 1.0, 1.0]
+    assert prototype.run("counter();") == 1.0
+
+
+def test_forks_do_not_rerun_the_prelude():
+    calls = []
+
+    class Log(LoxCallable):
+        def arity(self):
+            return 1
+
+        def call(self, interpreter, arguments):
+            calls.append(arguments[0])
+
+    prototype = Session()
+    prototype.define("log", Log())
+    prototype.run('log("prelude"); var total = 0; for (var i = 0; i < 20000; i = i + 1) total = total + i;')
+    pool = SessionPool(prototype, size=2)
+    for _ in range(3):
+        assert pool.run("total;") == 199990000.0
+    assert calls == ["prelude"]
+
+
+def test_command_line_does_not_import_embedding_api():
+    check = "import sys, lox.__main__; print(sorted({'lox.session', 'lox.aio', 'lox.meter', 'asyncio'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True)
+    assert result.stdout == "[]\n"
@@ -0,0 +1,31 @@
+from lox.__main__ import Lox
+from lox.interpreter import Interpreter
+from lox.parser import Parser
+from lox.scanner import Scanner
+from lox.stmt import Print
+
+
+def test_iter_parse_is_lazy():
+    def tokens():
+        yield from Scanner("print 1;").iter_tokens()
+        raise AssertionError("read past the first declaration")
+
+    statements = Parser(tokens()).iter_parse()
+    assert isinstance(next(statements), Print)
+
+
+def test_run_stream_executes_before_later_errors(capsys):
+    Lox.interpreter = Interpreter()
+    Lox.had_error = False
+    try:
+        Lox.run_stream("var a = 1;\nprint a + 1;\nprint (;\nprint 3;")
+        assert Lox.had_error
+    finally:
+        Lox.had_error = False
+    assert capsys.readouterr().out.splitlines()[0] == "2"
+
+
+def test_run_stream_returns_trailing_expression(capsys):
+    Lox.interpreter = Interpreter()
+    Lox.run_stream("fun f(x) { return x * 2; }\nf(21);")
+    assert capsys.readouterr().out == "42.0\n"
@@ -0,0 +1,60 @@
+import pytest
+
+from lox.__main__ import Lox
+from lox.interpreter import Interpreter
+from lox.transpiler import PythonEngine, CodeCache
+
+
+@pytest.fixture(autouse=True)
+def restore(monkeypatch):
+    for name in ("interpreter", "had_runtime_error"):
+        monkeypatch.setattr(Lox, name, getattr(Lox, name))
+
+
+def test_closure_per_iteration(capsys):
+    Lox.interpreter = PythonEngine()
+    Lox.run("""
+    var first;
+    for (var i = 0; i < 3; i = i + 1) {
+      var j = i;
+      fun show() { print j; }
+      if (i == 0) first = show;
+    }
+    first();
+    """)
+    assert capsys.readouterr().out == "0\n"
+
+
+def test_code_cache_skips_front_end(tmp_path, capsys, monkeypatch):
+    source = "var a = 1; print a + 2;"
+    Lox.interpreter = PythonEngine()
+    Lox.interpreter.code_cache = CodeCache(str(tmp_path))
+    Lox.run(source)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # a fresh engine loads the marshalled code without re-parsing
+    Lox.interpreter = PythonEngine()
+    Lox.interpreter.code_cache = CodeCache(str(tmp_path))
+    monkeypatch.setattr(Lox, "front_end", None)
+    Lox.run(source)
+    assert capsys.readouterr().out == "3\n3\n"
+
+
+@pytest.mark.parametrize("source, message", [
+    ('print "a" < "b";', "Operands must be a number."),
+    ("print true - 1;", "Operands must be a number."),
+    # a local that holds numbers until a closure stores a string in it
+    ('fun f() { var t = 1; fun g() { t = "z"; } g(); return t - 1; } f();', "Operands must be a number."),
+    ("fun f(a, b) { return a; } f(1);", "Expected 2 arguments but got 1."),
+    ("fun f(a, b) { return a; } f(1, 2, 3);", "Expected 2 arguments but got 3."),
+    ('"a"();', "Can only call functions and classes."),
+    ("print x;", " TokenType.IDENTIFIER x None Undefined variable x ."),
+    ("fun f() { y = 1; } f();", " TokenType.IDENTIFIER y None Undefined variable y ."),
+])
+def test_runtime_errors_match_the_tree_walker(source, message, capsys):
+    for engine in (Interpreter(), PythonEngine()):
+        Lox.interpreter = engine
+        Lox.had_runtime_error = False
+        Lox.run(source)
+        assert Lox.had_runtime_error
+        assert message in capsys.readouterr().err
@@ -2,11 +2,17 @@ from typing import Any
 from .token_type import TokenType
 
 class Token:
+    __slots__ = ("type", "lexeme", "literal", "line")
+
     def __init__(self, type: 'TokenType', lexeme: str, literal: Any, line: int):
         self.type: 'TokenType' = type
         self.lexeme: str = lexeme
         self.literal: Any = literal
         self.line: int = line
 
+    def __reduce__(self):
+        # positional args pickle far smaller than the generic slots state
+        return (Token, (self.type, self.lexeme, self.literal, self.line))
+
     def __str__(self) -> str:
         return f"{self.type} {self.lexeme} {self.literal}"
\ No newline at end of file
@@ -0,0 +1,305 @@
+from typing import Any
+
+from .compiler import Compiler, FunctionProto, OpCode
+from .interpreter import Interpreter
+from .lox_callable import LoxCallable, Clock
+from .stmt import Stmt
+from .runtime import is_truthy, is_equal, stringify
+from .output import StreamOutput
+
+# Plain ints so the dispatch comparisons below stay on CPython's int fast path.
+CONSTANT = int(OpCode.CONSTANT)
+NIL = int(OpCode.NIL)
+TRUE = int(OpCode.TRUE)
+FALSE = int(OpCode.FALSE)
+POP = int(OpCode.POP)
+POPN = int(OpCode.POPN)
+GET_LOCAL = int(OpCode.GET_LOCAL)
+SET_LOCAL = int(OpCode.SET_LOCAL)
+GET_CELL = int(OpCode.GET_CELL)
+SET_CELL = int(OpCode.SET_CELL)
+MAKE_CELL = int(OpCode.MAKE_CELL)
+GET_UPVALUE = int(OpCode.GET_UPVALUE)
+SET_UPVALUE = int(OpCode.SET_UPVALUE)
+GET_GLOBAL = int(OpCode.GET_GLOBAL)
+SET_GLOBAL = int(OpCode.SET_GLOBAL)
+DEFINE_GLOBAL = int(OpCode.DEFINE_GLOBAL)
+EQUAL = int(OpCode.EQUAL)
+NOT_EQUAL = int(OpCode.NOT_EQUAL)
+GREATER = int(OpCode.GREATER)
+GREATER_EQUAL = int(OpCode.GREATER_EQUAL)
+LESS = int(OpCode.LESS)
+LESS_EQUAL = int(OpCode.LESS_EQUAL)
+ADD = int(OpCode.ADD)
+SUBTRACT = int(OpCode.SUBTRACT)
+MULTIPLY = int(OpCode.MULTIPLY)
+DIVIDE = int(OpCode.DIVIDE)
+NOT = int(OpCode.NOT)
+NEGATE = int(OpCode.NEGATE)
+PRINT = int(OpCode.PRINT)
+JUMP = int(OpCode.JUMP)
+POP_JUMP_IF_FALSE = int(OpCode.POP_JUMP_IF_FALSE)
+JUMP_IF_FALSE_OR_POP = int(OpCode.JUMP_IF_FALSE_OR_POP)
+JUMP_IF_TRUE_OR_POP = int(OpCode.JUMP_IF_TRUE_OR_POP)
+CALL = int(OpCode.CALL)
+TAIL_CALL = int(OpCode.TAIL_CALL)
+CLOSURE = int(OpCode.CLOSURE)
+RETURN = int(OpCode.RETURN)
+
+# Lox frames live on a Python list, so this only bounds memory use.
+DEFAULT_MAX_DEPTH = 100_000
+
+
+class VMFunction(LoxCallable):
+    def __init__(self, proto: FunctionProto, cells: list):
+        self.proto = proto
+        self.cells = cells
+
+    def call(self, interpreter, arguments: list):
+        return interpreter.call_function(self, arguments)
+
+    def arity(self):
+        return self.proto.arity
+
+    def __str__(self):
+        return "<fn " + self.proto.name + ">"
+
+
+class VM:
+    """Stack machine that runs bytecode produced by `lox.compiler.Compiler`.
+
+    Drop-in alternative to Interpreter: the Resolver feeds it through
+    `resolve()` and `interpret()` returns the value of a trailing expression
+    statement. Lox calls push a frame on `frames` instead of recursing in
+    Python, so recursion depth is capped by `max_depth` rather than by
+    CPython's recursion limit.
+    """
+
+    RuntimeError = Interpreter.RuntimeError
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.max_depth = max_depth
+        self.globals: dict[str, Any] = {}
+        self._locals = {}
+        self.stack: list[Any] = []
+        self.globals["clock"] = Clock()
+        self.output = StreamOutput()
+
+    def resolve(self, expr, depth: int, slot: int):
+        self._locals[expr] = depth
+
+    def compile(self, statements: list[Stmt]) -> FunctionProto:
+        return Compiler(self._locals).compile(statements)
+
+    def interpret(self, statements: list[Stmt]):
+        try:
+            return self.call_function(VMFunction(self.compile(statements), []), [])
+        finally:
+            self.output.flush()
+
+    def call_function(self, function: VMFunction, arguments: list):
+        height = len(self.stack)
+        try:
+            return self.run(function, arguments)
+        except self.RuntimeError:
+            raise
+        except Exception as e:
+            raise self.RuntimeError(e)
+        finally:
+            del self.stack[height:]
+
+    def error(self, token, message: str):
+        return self.RuntimeError(f"{token} {message}")
+
+    def run(self, function: VMFunction, arguments: list):
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        globals_ = self.globals
+        max_depth = self.max_depth
+        write = self.output.write
+        frames = []
+
+        push(function)
+        base = len(stack)
+        stack.extend(arguments)
+        proto = function.proto
+        code = proto.code
+        constants = proto.constants
+        cells = function.cells
+        ip = 0
+
+        while True:
+            op, arg = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(stack[base + arg])
+            elif op == CONSTANT:
+                push(constants[arg])
+            elif op == GET_GLOBAL:
+                try:
+                    push(globals_[arg])
+                except KeyError:
+                    token = proto.tokens[ip - 1]
+                    raise self.RuntimeError(f" {token} Undefined variable {arg} .")
+            elif op == POP_JUMP_IF_FALSE:
+                value = pop()
+                if value is not True and (value is None or value is False or not is_truthy(value)):
+                    ip = arg
+            elif op == LESS or op == LESS_EQUAL or op == GREATER or op == GREATER_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(proto.tokens[ip - 1], "Operands must be a number.")
+                if op == LESS:
+                    stack[-1] = a < b
+                elif op == LESS_EQUAL:
+                    stack[-1] = a <= b
+                elif op == GREATER:
+                    stack[-1] = a > b
+                else:
+                    stack[-1] = a >= b
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if type(a) is float and type(b) is float:
+                    stack[-1] = a + b
+                elif isinstance(a, str) and isinstance(b, str):
+                    stack[-1] = a + b
+                else:
+                    stack[-1] = str(a) + str(b)
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(proto.tokens[ip - 1], "Operands must be a number.")
+                stack[-1] = a - b
+            elif op == CALL:
+                callee = stack[-1 - arg]
+                if type(callee) is VMFunction:
+                    if arg != callee.proto.arity:
+                        raise self.RuntimeError(f"Expected {callee.proto.arity} arguments but got {arg}.")
+                    if len(frames) >= max_depth:
+                        raise self.error(proto.tokens[ip - 1], "Stack overflow.")
+                    frames.append((function, ip, base))
+                    function = callee
+                    base = len(stack) - arg
+                    proto = callee.proto
+                    code = proto.code
+                    constants = proto.constants
+                    cells = callee.cells
+                    ip = 0
+                else:
+                    self.call_native(callee, arg)
+            elif op == TAIL_CALL:
+                callee = stack[-1 - arg]
+                if type(callee) is VMFunction:
+                    if arg != callee.proto.arity:
+                        raise self.RuntimeError(f"Expected {callee.proto.arity} arguments but got {arg}.")
+                    # slide callee and arguments down over the current frame
+                    stack[base - 1:] = stack[-1 - arg:]
+                    function = callee
+                    proto = callee.proto
+                    code = proto.code
+                    constants = proto.constants
+                    cells = callee.cells
+                    ip = 0
+                else:
+                    self.call_native(callee, arg)
+            elif op == RETURN:
+                result = pop()
+                del stack[base - 1:]
+                if not frames:
+                    return result
+                push(result)
+                function, ip, base = frames.pop()
+                proto = function.proto
+                code = proto.code
+                constants = proto.constants
+                cells = function.cells
+            elif op == POP:
+                pop()
+            elif op == SET_LOCAL:
+                stack[base + arg] = stack[-1]
+            elif op == GET_CELL:
+                push(stack[base + arg][0])
+            elif op == GET_UPVALUE:
+                push(cells[arg][0])
+            elif op == SET_CELL:
+                stack[base + arg][0] = stack[-1]
+            elif op == SET_UPVALUE:
+                cells[arg][0] = stack[-1]
+            elif op == JUMP:
+                ip = arg
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(proto.tokens[ip - 1], "Operands must be a number.")
+                stack[-1] = a * b
+            elif op == DIVIDE:
+                b = pop()
+                a = stack[-1]
+                if type(a) is not float or type(b) is not float:
+                    raise self.error(proto.tokens[ip - 1], "Operands must be a number.")
+                if b == 0.0:
+                    raise self.RuntimeError("Division by 0")
+                stack[-1] = a / b
+            elif op == EQUAL:
+                b = pop()
+                stack[-1] = is_equal(stack[-1], b)
+            elif op == NOT_EQUAL:
+                b = pop()
+                stack[-1] = not is_equal(stack[-1], b)
+            elif op == NOT:
+                stack[-1] = not is_truthy(stack[-1])
+            elif op == NEGATE:
+                stack[-1] = -float(stack[-1])
+            elif op == PRINT:
+                write(stringify(pop()))
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == POPN:
+                del stack[-arg:]
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if is_truthy(stack[-1]):
+                    pop()
+                else:
+                    ip = arg
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if is_truthy(stack[-1]):
+                    ip = arg
+                else:
+                    pop()
+            elif op == SET_GLOBAL:
+                if arg not in globals_:
+                    token = proto.tokens[ip - 1]
+                    raise self.RuntimeError(f" {token} Undefined variable {arg} .")
+                globals_[arg] = stack[-1]
+            elif op == DEFINE_GLOBAL:
+                globals_[arg] = pop()
+            elif op == MAKE_CELL:
+                stack[base + arg] = [stack[base + arg]]
+            elif op == CLOSURE:
+                child = constants[arg]
+                captured = []
+                for is_local, index in child.captures:
+                    captured.append(stack[base + index] if is_local else cells[index])
+                push(VMFunction(child, captured))
+            else:
+                raise self.RuntimeError(f"Unknown opcode {op}.")
+
+    def call_native(self, callee: Any, argc: int):
+        stack = self.stack
+        if not isinstance(callee, LoxCallable):
+            raise self.RuntimeError("Can only call functions and classes.")
+        arguments = stack[len(stack) - argc:]
+        if argc != callee.arity():
+            raise self.RuntimeError(f"Expected {callee.arity()} arguments but got {argc}.")
+        del stack[len(stack) - argc - 1:]
+        stack.append(callee.call(self, arguments))